@@ -1,14 +1,27 @@
-import requests
-import json
-import time
+import numpy as np
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+if __name__ == "__main__":
+    # Run as a script: put the repository root on the path for the common package
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
 
 # Additional imports
 from datetime import datetime
-from html_template import generate_html_content
-
-# Set the Binance API endpoint
-api_url = "https://api.binance.com"
+from dashboard_server import DashboardServer
+from html_template import SignalDashboard
+from kline_cache import KlineCache
+from records import Signal
+from signal_store import SignalStore
+from ticker_columns import SymbolIndex, TickerSnapshot, above_moving_average, ticker_schema, volume_spike_rows
+
+from common.http_client import binance_client
+from common.json_decoder import loads
+from common.metrics import metrics
+from common.scheduler import Scheduler
+
+# Set the Binance API endpoints
 ticker_24hr_endpoint = "/api/v3/ticker/24hr"
 klines_endpoint = "/api/v3/klines"
 
@@ -18,106 +31,197 @@ min_volume_increase_pct = 10
 # Set the time interval between fetches in seconds (e.g., 20 seconds)
 fetch_interval = 20
 
-# Set the moving average window (e.g., 20 periods)
+# Set the moving average window (e.g., 20 periods) and the kline intervals it is computed on;
+# a symbol is signalled on every interval whose moving average its price is above
 moving_average_window = 20
+kline_intervals = ["1h"]  # e.g. ["5m", "15m", "1h", "4h"]
+
+# Set the quote assets of the watched markets
+quote_assets = ["BTC"]  # e.g. ["BTC", "USDT", "ETH", "BNB"]
+
+# Set the maximum number of klines requests in flight at once
+max_concurrent_requests = 8
+
+# Shared rate-limited Binance client so kline requests reuse pooled connections
+client = binance_client(pool_size=max_concurrent_requests)
+
+# Worker pool shared by the klines requests of all symbols and intervals of a cycle
+kline_executor = ThreadPoolExecutor(max_workers=max_concurrent_requests)
+
+# Cache of the last moving_average_window klines per (symbol, interval); symbols
+# not evaluated for kline_cache_ttl seconds are dropped. It holds a series for up to
+# max_symbols_per_quote_asset symbols of every quote asset on every interval, so one
+# cycle never evicts series it is still going to read
+kline_cache_ttl = 3600
+max_symbols_per_quote_asset = 1000
+kline_cache = KlineCache(moving_average_window, max_series=max_symbols_per_quote_asset * len(quote_assets) * len(kline_intervals),
+                         ttl=kline_cache_ttl)
+
+# Set the port of the optional live dashboard server, which pushes new signals to open
+# pages instead of having them reload the HTML file (e.g., 8000; None to disable)
+dashboard_port = None
+
+# History of every emitted signal; signals are resolved against the price
+# signal_outcome_horizon seconds later to compute hit rates. A signal without a price
+# within signal_outcome_tolerance seconds after that (e.g. while the monitor was
+# down) is left unresolved
+signal_store = SignalStore("signals.db")
+signal_outcome_horizon = 3600
+signal_outcome_tolerance = 3 * fetch_interval
+
+# Set the port of the Prometheus-style metrics endpoint and/or a file the metrics are
+# dumped to as JSON every minute (both None to disable the metrics)
+metrics_port = None
+metrics_dump_file = None
+
+# Row index shared by all ticker snapshots so their columns stay aligned between cycles
+symbol_index = SymbolIndex(tuple(quote_assets))  # Only consider symbols ending with one of the quote assets
 
 def fetch_24hr_ticker_price_change():
-    response = requests.get(api_url + ticker_24hr_endpoint)
+    response = client.get(ticker_24hr_endpoint, weight=80)
     if response.status_code == 200:
-        return json.loads(response.text)
+        return ticker_schema.decode_columns(response.content)
     else:
         print("Failed to fetch data from Binance API")
-        return []
+        return ticker_schema.columns([])
 
-def fetch_klines_data(symbol, interval):
+def fetch_klines_data(symbol, interval, start_time=None):
     params = {
         "symbol": symbol,
         "interval": interval,
         "limit": moving_average_window
     }
-    response = requests.get(api_url + klines_endpoint, params=params)
+    if start_time is not None:
+        params["startTime"] = start_time
+    response = client.get(klines_endpoint, params=params, weight=2)
     if response.status_code == 200:
-        return json.loads(response.text)
+        return loads(response.content)
     else:
         print(f"Failed to fetch klines data for {symbol}")
         return []
 
+def fetch_klines_batch(start_times):
+    # Fetch the klines of all (symbol, interval) keys on the shared worker pool,
+    # keeping at most max_concurrent_requests requests in flight
+    keys = list(start_times)
+    results = kline_executor.map(lambda key: fetch_klines_data(key[0], key[1], start_times[key]), keys)
+    return dict(zip(keys, results))
+
+def calculate_moving_averages(symbols, intervals, last_prices=None):
+    # Only download the candles missing from the cache, then patch the still-open
+    # candle with the latest ticker price so no request is needed until it closes.
+    # Each (symbol, interval) is fetched at most once per cycle, whatever the
+    # number of symbols and intervals evaluated.
+    start_times = {}
+    for interval in intervals:
+        for symbol, start_time in kline_cache.missing_start_times(symbols, interval).items():
+            start_times[(symbol, interval)] = start_time
+
+    for (symbol, interval), klines_data in fetch_klines_batch(start_times).items():
+        if klines_data:
+            kline_cache.update(symbol, interval, klines_data, replace=start_times[(symbol, interval)] is None)
+
+    # Evicted only once the whole cycle's moving averages are read
+    moving_averages = {}
+    for interval in intervals:
+        for symbol in symbols:
+            if last_prices and symbol in last_prices:
+                kline_cache.update_last_price(symbol, interval, last_prices[symbol])
+            moving_averages[(symbol, interval)] = kline_cache.moving_average(symbol, interval)
+
+    kline_cache.evict()
+    return moving_averages
+
 def calculate_moving_average(symbol, interval):
-    klines_data = fetch_klines_data(symbol, interval)
-    if not klines_data:
-        return None
+    return calculate_moving_averages([symbol], [interval])[(symbol, interval)]
 
-    closing_prices = [float(kline[4]) for kline in klines_data]
-    moving_average = sum(closing_prices) / len(closing_prices)
-    return moving_average
+def build_signal(symbol, interval, volume_change_pct, price_change_pct, moving_average, current_price):
+    return Signal(symbol, symbol_index.quote_asset(symbol), interval, volume_change_pct, price_change_pct, moving_average, current_price)
 
-def filter_symbols_with_potential_volume_increase(ticker_data, previous_ticker_data, threshold, interval):
+def filter_symbols_with_potential_volume_increase(ticker_snapshot, previous_ticker_snapshot, threshold, intervals):
     potential_symbols = []
 
-    if not previous_ticker_data:
+    if previous_ticker_snapshot is None:
         return potential_symbols
 
-    ticker_data_dict = {ticker['symbol']: ticker for ticker in ticker_data}
+    # Volume change, threshold and quote-asset masks over the whole ticker universe at once
+    rows, volume_change_pct = volume_spike_rows(ticker_snapshot, previous_ticker_snapshot, threshold)
+    symbols = [symbol_index.symbols[row] for row in rows]
 
-    for prev_ticker in previous_ticker_data:
-        symbol = prev_ticker['symbol']
-        prev_quote_volume = float(prev_ticker['quoteVolume'])
+    # Fetch the missing klines of all candidates on all intervals concurrently
+    last_prices = dict(zip(symbols, ticker_snapshot.last_price[rows].tolist()))
+    moving_averages = calculate_moving_averages(symbols, intervals, last_prices)
 
-        if symbol in ticker_data_dict and symbol.endswith('BTC'):  # Only consider symbols ending with 'BTC'
-            current_ticker = ticker_data_dict[symbol]
-            current_quote_volume = float(current_ticker['quoteVolume'])
+    for interval in intervals:
+        above = above_moving_average(ticker_snapshot, rows, [moving_averages[(symbol, interval)] for symbol in symbols])
+        for i in np.flatnonzero(above):
+            row = rows[i]
+            potential_symbols.append(build_signal(
+                symbols[i], interval, float(volume_change_pct[i]), float(ticker_snapshot.price_change_pct[row]),
+                moving_averages[(symbols[i], interval)], float(ticker_snapshot.last_price[row])
+            ))
 
-            if prev_quote_volume != 0:
-                volume_change_pct = (current_quote_volume - prev_quote_volume) / prev_quote_volume * 100
-
-                if volume_change_pct >= threshold:
-                    price_change_pct = float(current_ticker['priceChangePercent'])
-                    price_direction = "Up" if price_change_pct > 0 else "Down"
+    return potential_symbols
 
-                    moving_average = calculate_moving_average(symbol, interval)
-                    current_price = float(current_ticker['lastPrice'])
+def stored_signal(row):
+    return build_signal(row['symbol'], row['interval'], row['volume_change_pct'], row['price_change_pct'], row['moving_average'], row['current_price'])
 
-                    if moving_average and current_price > moving_average:
-                        potential_symbols.append({
-                            'symbol': symbol,
-                            'volume_change_pct': volume_change_pct,
-                            'price_change_pct': price_change_pct,
-                            'price_direction': price_direction,
-                            'moving_average': moving_average,
-                            'current_price': current_price,
-                            'exchange_link': f"https://www.binance.com/en/trade/{symbol}",
-                            'logo_url': 'logo.png'
-                        })
+def load_dashboard(dashboard):
+    # Seed the dashboard with the last signal batches from the store, oldest first
+    for batch in reversed(signal_store.recent_batches(dashboard.max_tables)):
+        dashboard.add([stored_signal(row) for row in batch])
 
-    return potential_symbols
+def last_prices(ticker_snapshot):
+    rows = np.flatnonzero(ticker_snapshot.present)
+    return dict(zip([symbol_index.symbols[row] for row in rows], ticker_snapshot.last_price[rows].tolist()))
 
 def save_html_file(html_content, file_name="potential_buy_signals.html"):
-    with open(file_name, "w") as f:
+    # Write next to the target and swap the file in, so a browser never loads a half-written page
+    temp_file_name = file_name + ".tmp"
+    with open(temp_file_name, "w") as f:
         f.write(html_content)
+    os.replace(temp_file_name, file_name)
 
 def main():
-    previous_ticker_data = []
-    interval = "1h"
-    last_5_signals = []
-
-    while True:
-        current_ticker_data = fetch_24hr_ticker_price_change()
-        potential_symbols = filter_symbols_with_potential_volume_increase(current_ticker_data, previous_ticker_data, min_volume_increase_pct, interval)
-
-        if potential_symbols:
-            last_5_signals.append(potential_symbols)
-            last_5_signals = last_5_signals[-5:]
-            
-            html_content = generate_html_content(last_5_signals, {}, fetch_interval)  # Pass fetch_interval as an argument
-
-            save_html_file(html_content)
-            print("Saved potential buy signals to HTML file")
-        else:
-            print("No symbols with potential volume increase and above moving average found")
-
-        previous_ticker_data = current_ticker_data
-        print(f"Waiting {fetch_interval} seconds before the next fetch...")
-        time.sleep(fetch_interval)
+    previous_ticker_snapshot = None
+    signal_store.start()
+    dashboard = SignalDashboard(fetch_interval)
+    load_dashboard(dashboard)
+    dashboard_server = DashboardServer(dashboard, signal_store, port=dashboard_port).start() if dashboard_port else None
+
+    metrics.configure(metrics_port, metrics_dump_file)
+
+    def poll_tickers():
+        nonlocal previous_ticker_snapshot
+        with metrics.cycle("volume", fetch_interval):
+            with metrics.timer("stage_seconds", loop="volume", stage="fetch"):
+                ticker_columns = fetch_24hr_ticker_price_change()
+            with metrics.timer("stage_seconds", loop="volume", stage="parse"):
+                current_ticker_snapshot = TickerSnapshot(symbol_index, ticker_columns)
+            with metrics.timer("stage_seconds", loop="volume", stage="compute"):
+                potential_symbols = filter_symbols_with_potential_volume_increase(current_ticker_snapshot, previous_ticker_snapshot, min_volume_increase_pct, kline_intervals)
+
+            signal_store.resolve(last_prices(current_ticker_snapshot), signal_outcome_horizon, signal_outcome_tolerance)
+            if potential_symbols:
+                metrics.inc("signals_total", len(potential_symbols), loop="volume")
+                signal_store.add(potential_symbols)
+
+                # Only the new signal table is rendered; the rest of the page is cached
+                with metrics.timer("stage_seconds", loop="volume", stage="render"):
+                    signal_section = dashboard.add(potential_symbols)
+                    save_html_file(dashboard.render())
+                if dashboard_server:
+                    dashboard_server.publish(signal_section)
+                print("Saved potential buy signals to HTML file")
+            else:
+                print("No symbols with potential volume increase and above moving average found")
+
+        previous_ticker_snapshot = current_ticker_snapshot
+
+    # Cycles start every fetch_interval seconds, however long the fetch and the filter take
+    scheduler = Scheduler()
+    scheduler.every(fetch_interval, poll_tickers)
+    scheduler.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,103 @@
+import json
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Send a comment on idle event streams this often (seconds) so dropped browsers are noticed
+keepalive_interval = 15
+
+class DashboardRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        dashboard_server = self.server.dashboard_server
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        store = dashboard_server.store
+
+        if self.path in ("/", "/index.html"):
+            self.send_body(dashboard_server.dashboard.render(live=True).encode(), "text/html; charset=utf-8")
+        elif url.path == "/signals" and store and "symbol" in query:
+            # e.g. /signals?symbol=ETHBTC&hours=24
+            since = time.time() - float(query.get("hours", ["24"])[0]) * 3600
+            self.send_body(json.dumps(store.signals_for(query["symbol"][0], since)).encode(), "application/json")
+        elif url.path == "/hit-rate" and store:
+            # e.g. /hit-rate?bucket=10
+            bucket_size = float(query.get("bucket", ["10"])[0])
+            self.send_body(json.dumps(store.hit_rate_by_volume_change(bucket_size)).encode(), "application/json")
+        elif self.path == "/events":
+            self.stream_events(dashboard_server)
+        elif self.path == "/logo.png" and os.path.exists("logo.png"):
+            with open("logo.png", "rb") as f:
+                self.send_body(f.read(), "image/png")
+        else:
+            self.send_error(404)
+
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self, dashboard_server):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        events = dashboard_server.subscribe()
+        try:
+            while True:
+                try:
+                    message = events.get(timeout=keepalive_interval)
+                except queue.Empty:
+                    message = ": keepalive\n\n"
+                self.wfile.write(message.encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            dashboard_server.unsubscribe(events)
+
+    def log_message(self, format, *args):
+        pass
+
+class DashboardServer:
+    # Serves the live dashboard page and pushes each new signal table to the open
+    # pages over Server-Sent Events, so browsers insert the new rows instead of
+    # reloading the whole page. With a signal store it also answers history queries
+    # on /signals and /hit-rate.
+    def __init__(self, dashboard, store=None, host="127.0.0.1", port=8000):
+        self.dashboard = dashboard
+        self.store = store
+        self.httpd = ThreadingHTTPServer((host, port), DashboardRequestHandler)
+        self.httpd.dashboard_server = self
+        self.clients = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        events = queue.Queue()
+        with self.lock:
+            self.clients.add(events)
+        return events
+
+    def unsubscribe(self, events):
+        with self.lock:
+            self.clients.discard(events)
+
+    def publish(self, fragment):
+        # One SSE message; every line of the fragment goes in its own data field
+        message = "".join(f"data: {line}\n" for line in fragment.splitlines()) + "\n"
+        with self.lock:
+            for events in self.clients:
+                events.put(message)
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        print(f"Serving the live dashboard on http://{self.httpd.server_address[0]}:{self.httpd.server_port}/")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
@@ -1,126 +1,118 @@
+from collections import deque
 from datetime import datetime
 
-def generate_html_content(last_5_signals, logo_urls, fetch_interval):
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    html_content = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta http-equiv="refresh" content="{fetch_interval}">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{current_time}</title>
-<style>
-        body {{
+# Static part of the page, built once and reused by every render
+page_style = """<style>
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             margin: 0;
             padding: 0;
             background-color: #222831;
             color: #ffffff;
-        }}
+        }
 
-        h1 {{
+        h1 {
             background-color: #393e46;
             color: #ffffff;
             padding: 20px;
             margin: 0;
             animation: fadeIn 1s ease-in-out both;
-        }}
+        }
 
-        h2 {{
+        h2 {
             padding: 10px;
             background-color: #393e46;
             margin: 0;
             animation: fadeIn 1s ease-in-out both;
             animation-delay: 0.5s;
-        }}
+        }
 
-        table {{
+        table {
             width: 100%;
             border-collapse: collapse;
             margin-bottom: 20px;
             opacity: 0;
             animation: fadeIn 1s ease-in-out forwards;
             animation-delay: 1s;
-        }}
+        }
         
-        th, td {{
+        th, td {
             padding: 8px;
             text-align: left;
             border-bottom: 1px solid #444;
-        }}
+        }
         
-        th {{
+        th {
             background-color: #2d3436;
             font-weight: bold;
-        }}
+        }
 
-        tbody tr:nth-child(even) {{
+        tbody tr:nth-child(even) {
             background-color: #393e46;
-        }}
+        }
 
-        tbody tr:hover {{
+        tbody tr:hover {
             background-color: #4e525a;
             transition: background-color 0.3s ease-in-out;
-        }}
+        }
 
-        a {{
+        a {
             text-decoration: none;
             color: #00adb5;
-        }}
+        }
         
-        a:hover {{
+        a:hover {
             text-decoration: underline;
-        }}
+        }
 
-        .up {{
+        .up {
             color: #5eba7d;
-        }}
+        }
 
-        .down {{
+        .down {
             color: #e17055;
-        }}
+        }
 
-        .container {{
+        .container {
             max-width: 1200px;
             margin: 0 auto;
             padding: 20px;
-        }}
+        }
 
-        .coin-logo {{
+        .coin-logo {
             vertical-align: middle;
             margin-right: 5px;
             transition: transform 0.3s ease-in-out;
-        }}
+        }
 
-        .coin-logo:hover {{
+        .coin-logo:hover {
             transform: scale(1.2);
-        }}
+        }
 
-        @media (max-width: 767px) {{
-            table, thead, tbody, th, td, tr {{
+        @media (max-width: 767px) {
+            table, thead, tbody, th, td, tr {
                 display: block;
-            }}
+            }
 
-            thead tr {{
+            thead tr {
                 position: absolute;
                 top: -9999px;
                 left: -9999px;
-            }}
+            }
 
-            tr {{
+            tr {
                 border: 1px solid #ccc;
                 margin-bottom: 10px;
-            }}
+            }
 
-            td {{
+            td {
                 border: none;
                 border-bottom: 1px solid #eee;
                 position: relative;
                 padding-left: 50%;
-            }}
+            }
 
-            td:before {{
+            td:before {
                 content: attr(data-label);
                 position: absolute;
                 top: 6px;
@@ -129,40 +121,29 @@ def generate_html_content(last_5_signals, logo_urls, fetch_interval):
                 width: 45%;
                 padding-right: 10px;
                 white-space: nowrap;
-            }}
-            td:last-child {{
+            }
+            td:last-child {
                padding-bottom: 20px;
-            }}
-    }}
+            }
+    }
 
-    @keyframes fadeIn {{
-        0% {{
+    @keyframes fadeIn {
+        0% {
             opacity: 0;
-        }}
-        100% {{
+        }
+        100% {
             opacity: 1;
-        }}
-    }}
+        }
+    }
 </style>
-</head>
-<body>
-    <header>
-        <div style="display: flex; align-items: center; justify-content: space-between; background-color: #393e46; padding: 10px;">
-            <img src="logo.png" alt="Logo" style="width: 100px; height: auto;">
-            <h1>Navigate Market Trends - {current_time}</h1>
-        </div>
-    </header>
-    <div class="container">
 """
 
-
-    for idx, potential_symbols in enumerate(reversed(last_5_signals), 1):
-        html_content += f"<h2>Signal {idx}</h2>"
-        html_content += """
+table_head = """
         <table>
             <thead>
                 <tr>
                     <th>Symbol</th>
+                    <th>Interval</th>
                     <th>Volume Change</th>
                     <th>Price Change</th>
                     <th>Direction</th>
@@ -174,36 +155,121 @@ def generate_html_content(last_5_signals, logo_urls, fetch_interval):
             <tbody>
     """
 
-        for symbol in potential_symbols:
-            formatted_current_price = f"{symbol['current_price']:.8f}"
-            formatted_moving_average = f"{symbol['moving_average']:.8f}"
-            direction_class = "up" if symbol['price_direction'] == "Up" else "down"
-            base_coin_symbol = symbol['symbol'][:-3]  
-            coin_logo_url = "logo.png"  # Use the same logo for all coins
+table_foot = """
+            </tbody>
+        </table>
+    """
+
+page_foot = """
+    </div>
+</body>
+</html>
+"""
+
+# Loaded by pages served by the dashboard server: new signal tables pushed over
+# Server-Sent Events are inserted at the top instead of reloading the page
+live_script = """
+    <script>
+        const maxTables = %d;
+        const events = new EventSource("/events");
+        events.onmessage = (event) => {
+            const container = document.querySelector(".container");
+            container.insertAdjacentHTML("afterbegin", event.data);
+            const sections = container.querySelectorAll("section.signal");
+            sections.forEach((section, i) => {
+                if (i >= maxTables) {
+                    section.remove();
+                } else {
+                    section.querySelector("h2").textContent = `Signal ${i + 1}`;
+                }
+            });
+            document.title = new Date().toLocaleString();
+        };
+    </script>
+"""
+
+def render_head(current_time, fetch_interval=None):
+    # Without a fetch_interval the page does not reload itself
+    fragments = ["""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+"""]
+    if fetch_interval is not None:
+        fragments.append(f"""    <meta http-equiv="refresh" content="{fetch_interval}">
+""")
+    fragments.append(f"""    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{current_time}</title>
+""")
+    fragments.append(page_style)
+    fragments.append(f"""
+</head>
+<body>
+    <header>
+        <div style="display: flex; align-items: center; justify-content: space-between; background-color: #393e46; padding: 10px;">
+            <img src="logo.png" alt="Logo" style="width: 100px; height: auto;">
+            <h1>Navigate Market Trends - {current_time}</h1>
+        </div>
+    </header>
+    <div class="container">
+""")
+    return fragments
+
+def render_signal_row(symbol):
+    formatted_current_price = f"{symbol.current_price:.8f}"
+    formatted_moving_average = f"{symbol.moving_average:.8f}"
+    direction_class = "up" if symbol.price_direction == "Up" else "down"
 
-            html_content += f"""
+    return f"""
             <tr class="{direction_class}">
                 <td data-label="Symbol">
-                    <img class="coin-logo" src="{coin_logo_url}" alt="{base_coin_symbol} logo" width="24" height="24">
-                    {symbol['symbol']}
+                    <img class="coin-logo" src="{symbol.logo_url}" alt="{symbol.base_asset} logo" width="24" height="24">
+                    {symbol.symbol}
                 </td>
-                <td data-label="Volume Change">{symbol['volume_change_pct']:.2f}%</td>
-                <td data-label="Price Change">{symbol['price_change_pct']}%</td>
-                <td data-label="Direction">{symbol['price_direction']}</td>
+                <td data-label="Interval">{symbol.interval}</td>
+                <td data-label="Volume Change">{symbol.volume_change_pct:.2f}%</td>
+                <td data-label="Price Change">{symbol.price_change_pct}%</td>
+                <td data-label="Direction">{symbol.price_direction}</td>
                 <td data-label="Moving Average">{formatted_moving_average}</td>
                 <td data-label="Current Price">{formatted_current_price}</td>
                 <td data-label="Exchange Link">
-                    <a href="{symbol['exchange_link']}">Trade on Binance</a>
+                    <a href="{symbol.exchange_link}">Trade on Binance</a>
                 </td>
             </tr>
     """
-        html_content += """
-            </tbody>
-        </table>
-    """
-    html_content += """
-    </div>
-</body>
-</html>
-"""
-    return html_content
\ No newline at end of file
+
+def render_signal_table(potential_symbols):
+    return "".join([table_head] + [render_signal_row(symbol) for symbol in potential_symbols] + [table_foot])
+
+def render_signal_section(idx, table):
+    return f'<section class="signal"><h2>Signal {idx}</h2>{table}</section>'
+
+class SignalDashboard:
+    # Rendered tables of the last max_tables signal batches, newest first. A batch
+    # is rendered once when it is added; rendering the page only joins fragments.
+    def __init__(self, fetch_interval, max_tables=5):
+        self.fetch_interval = fetch_interval
+        self.max_tables = max_tables
+        self.tables = deque(maxlen=max_tables)
+
+    def add(self, potential_symbols):
+        # Returns the new table as a section, ready to be pushed to live pages
+        table = render_signal_table(potential_symbols)
+        self.tables.appendleft(table)
+        return render_signal_section(1, table)
+
+    def render(self, live=False):
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        fragments = render_head(current_time, None if live else self.fetch_interval)
+        fragments.extend(render_signal_section(idx, table) for idx, table in enumerate(self.tables, 1))
+        if live:
+            fragments.append(live_script % self.max_tables)
+        fragments.append(page_foot)
+        return "".join(fragments)
+
+def generate_html_content(last_5_signals, logo_urls, fetch_interval):
+    dashboard = SignalDashboard(fetch_interval, max(len(last_5_signals), 1))
+    for potential_symbols in last_5_signals:
+        dashboard.add(potential_symbols)
+    return dashboard.render()
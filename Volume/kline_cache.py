@@ -0,0 +1,122 @@
+import time
+from collections import OrderedDict, deque
+
+from common.indicators import SMA
+
+# Length of one candle for each Binance interval unit, in milliseconds
+interval_unit_ms = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+def interval_to_ms(interval):
+    return int(interval[:-1]) * interval_unit_ms[interval[-1]]
+
+class KlineSeries:
+    # Open times of the last `window` candles and the streaming SMA of their closes,
+    # so the moving average is updated in O(1) per candle instead of re-summing the window
+    def __init__(self, window):
+        self.open_times = deque(maxlen=window)
+        self.closes = SMA(window)
+        self.last_close_time = None
+        self.last_access = time.time()
+
+    def clear(self):
+        self.open_times.clear()
+        self.closes.clear()
+        self.last_close_time = None
+
+    def append(self, open_time, close, close_time):
+        if self.open_times and open_time == self.open_times[-1]:
+            # Same candle again (it was still open last time): replace its close
+            self.closes.replace_last(close)
+        elif self.open_times and open_time < self.open_times[-1]:
+            return
+        else:
+            self.open_times.append(open_time)
+            self.closes.update(close)
+        self.last_close_time = close_time
+
+    def update_last_price(self, price):
+        # The close of a candle that is still open is the last traded price
+        if len(self.closes):
+            self.closes.replace_last(price)
+
+    def moving_average(self):
+        return self.closes.value
+
+class KlineCache:
+    # Per-(symbol, interval) kline cache. Only the candles missing since the last
+    # cached close time are requested, and evict() drops the series that have not
+    # been read for `ttl` seconds (or beyond `max_series`, least recently used first).
+    # Writes never evict, so callers evict once they have read what they fetched.
+    def __init__(self, window, max_series=1000, ttl=3600):
+        self.window = window
+        self.max_series = max_series
+        self.ttl = ttl
+        self.series = OrderedDict()
+
+    def get(self, symbol, interval):
+        series = self.series.get((symbol, interval))
+        if series is not None:
+            series.last_access = time.time()
+            self.series.move_to_end((symbol, interval))
+        return series
+
+    def missing_start_times(self, symbols, interval, now=None):
+        # Map each symbol whose cached series is stale to the startTime to request
+        # from, or None when the whole window has to be (re)downloaded
+        now_ms = int((now or time.time()) * 1000)
+        interval_ms = interval_to_ms(interval)
+        start_times = {}
+
+        for symbol in symbols:
+            series = self.get(symbol, interval)
+            if series is None or not series.open_times:
+                start_times[symbol] = None
+            elif now_ms > series.last_close_time:
+                missed_candles = (now_ms - series.open_times[-1]) // interval_ms
+                start_times[symbol] = series.open_times[-1] if missed_candles < self.window else None
+
+        return start_times
+
+    def update(self, symbol, interval, klines_data, replace=False):
+        key = (symbol, interval)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = KlineSeries(self.window)
+        elif replace:
+            series.clear()
+
+        for kline in klines_data:
+            series.append(int(kline[0]), float(kline[4]), int(kline[6]))
+
+        series.last_access = time.time()
+        self.series.move_to_end(key)
+
+    def update_kline(self, symbol, interval, open_time, close, close_time):
+        # Keep an already seeded series current from a streamed kline; a series
+        # that missed candles is dropped so the next read downloads it again
+        key = (symbol, interval)
+        series = self.series.get(key)
+        if series is None:
+            return
+        if series.open_times and open_time - series.open_times[-1] > interval_to_ms(interval):
+            del self.series[key]
+            return
+        series.append(open_time, close, close_time)
+
+    def update_last_price(self, symbol, interval, price, now=None):
+        series = self.series.get((symbol, interval))
+        now_ms = int((now or time.time()) * 1000)
+        if series is not None and series.last_close_time is not None and now_ms <= series.last_close_time:
+            series.update_last_price(price)
+
+    def moving_average(self, symbol, interval):
+        series = self.get(symbol, interval)
+        return series.moving_average() if series is not None else None
+
+    def evict(self, now=None):
+        expire_before = (now or time.time()) - self.ttl
+        while self.series:
+            key, series = next(iter(self.series.items()))
+            if len(self.series) <= self.max_series and series.last_access >= expire_before:
+                break
+            del self.series[key]
@@ -0,0 +1,39 @@
+class Ticker:
+    # Latest 24hr ticker of one symbol, parsed to numbers once when it arrives
+    __slots__ = ('quote_volume', 'last_price', 'price_change_pct', 'event_time')
+
+    def __init__(self, quote_volume, last_price, price_change_pct, event_time):
+        self.quote_volume = quote_volume
+        self.last_price = last_price
+        self.price_change_pct = price_change_pct
+        self.event_time = event_time
+
+class Signal:
+    # One volume signal. Only the numbers and the symbol are stored; the direction,
+    # base asset, logo and exchange link are derived on access rather than repeated
+    # in every record.
+    __slots__ = ('symbol', 'quote_asset', 'interval', 'volume_change_pct', 'price_change_pct', 'moving_average', 'current_price')
+
+    exchange_url = "https://www.binance.com/en/trade/"
+    logo_url = "logo.png"  # Use the same logo for all coins
+
+    def __init__(self, symbol, quote_asset, interval, volume_change_pct, price_change_pct, moving_average, current_price):
+        self.symbol = symbol
+        self.quote_asset = quote_asset
+        self.interval = interval
+        self.volume_change_pct = volume_change_pct
+        self.price_change_pct = price_change_pct
+        self.moving_average = moving_average
+        self.current_price = current_price
+
+    @property
+    def price_direction(self):
+        return "Up" if self.price_change_pct > 0 else "Down"
+
+    @property
+    def base_asset(self):
+        return self.symbol[:-len(self.quote_asset)] if self.quote_asset else self.symbol
+
+    @property
+    def exchange_link(self):
+        return self.exchange_url + self.symbol
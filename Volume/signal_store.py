@@ -0,0 +1,152 @@
+import argparse
+import queue
+import sqlite3
+import threading
+import time
+
+schema = """
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    volume_change_pct REAL NOT NULL,
+    price_change_pct REAL NOT NULL,
+    moving_average REAL NOT NULL,
+    current_price REAL NOT NULL,
+    outcome_price REAL
+);
+CREATE INDEX IF NOT EXISTS signals_symbol_timestamp ON signals (symbol, timestamp);
+CREATE INDEX IF NOT EXISTS signals_timestamp ON signals (timestamp);
+CREATE INDEX IF NOT EXISTS signals_unresolved ON signals (timestamp) WHERE outcome_price IS NULL;
+"""
+
+signal_columns = ("timestamp", "symbol", "interval", "volume_change_pct", "price_change_pct", "moving_average", "current_price")
+
+class SignalStore:
+    # Append-only SQLite (WAL) history of every emitted signal. add() and resolve()
+    # only queue work; a background thread writes it in batches, one transaction
+    # per batch, so the fetch cycle never waits on the disk. Queries use their own
+    # connection per thread and read alongside the writer.
+    def __init__(self, path="signals.db", batch_size=500, flush_interval=1):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue()
+        self.local = threading.local()
+        self.thread = None
+
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(schema)
+        return connection
+
+    def reader(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = self.connect()
+            connection.row_factory = sqlite3.Row
+        return connection
+
+    def add(self, signals, timestamp=None):
+        # All signals of one cycle share its timestamp, which groups them into a batch
+        timestamp = time.time() if timestamp is None else timestamp
+        rows = [(timestamp, signal.symbol, signal.interval, signal.volume_change_pct, signal.price_change_pct,
+                 signal.moving_average, signal.current_price) for signal in signals]
+        self.pending.put(("insert", rows))
+
+    def resolve(self, last_prices, horizon, tolerance, now=None):
+        # Record the price `horizon` seconds after each signal from the latest prices
+        # (symbol -> price), so hit rates can be computed later. Only signals between
+        # horizon and horizon + tolerance seconds old are resolved; older ones (e.g.
+        # after downtime) stay unresolved rather than being scored against a later price
+        now = time.time() if now is None else now
+        self.pending.put(("resolve", (last_prices, now - horizon - tolerance, now - horizon)))
+
+    def write(self, connection, operations):
+        with connection:
+            for operation, arguments in operations:
+                if operation == "insert":
+                    connection.executemany(f"INSERT INTO signals ({', '.join(signal_columns)}) VALUES (?, ?, ?, ?, ?, ?, ?)", arguments)
+                else:
+                    last_prices, since, before = arguments
+                    symbols = [row[0] for row in connection.execute(
+                        "SELECT DISTINCT symbol FROM signals WHERE outcome_price IS NULL AND timestamp BETWEEN ? AND ?", (since, before))]
+                    connection.executemany(
+                        "UPDATE signals SET outcome_price = ? WHERE symbol = ? AND outcome_price IS NULL AND timestamp BETWEEN ? AND ?",
+                        [(last_prices[symbol], symbol, since, before) for symbol in symbols if symbol in last_prices])
+
+    def run(self):
+        connection = self.connect()
+        while True:
+            operations = [self.pending.get()]
+            deadline = time.time() + self.flush_interval
+            while len(operations) < self.batch_size:
+                try:
+                    operations.append(self.pending.get(timeout=max(deadline - time.time(), 0)))
+                except queue.Empty:
+                    break
+
+            try:
+                self.write(connection, operations)
+            except sqlite3.Error as e:
+                print(f"Failed to write {len(operations)} signal store operations: {e}")
+            for _ in operations:
+                self.pending.task_done()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def flush(self):
+        # Block until everything queued so far is written
+        self.pending.join()
+
+    def signals_for(self, symbol, since=None):
+        # Signals of one symbol, newest first (default: the last 24 hours)
+        since = time.time() - 24 * 3600 if since is None else since
+        rows = self.reader().execute(
+            "SELECT * FROM signals WHERE symbol = ? AND timestamp >= ? ORDER BY timestamp DESC", (symbol, since))
+        return [dict(row) for row in rows]
+
+    def recent_batches(self, count=5):
+        # The signals of the last `count` cycles that had any, newest cycle first
+        rows = self.reader().execute(
+            "SELECT * FROM signals WHERE timestamp IN (SELECT DISTINCT timestamp FROM signals ORDER BY timestamp DESC LIMIT ?) "
+            "ORDER BY timestamp DESC, id", (count,))
+        batches = []
+        for row in rows:
+            if not batches or batches[-1][0]['timestamp'] != row['timestamp']:
+                batches.append([])
+            batches[-1].append(dict(row))
+        return batches
+
+    def hit_rate_by_volume_change(self, bucket_size=10, since=0):
+        # Share of resolved signals whose price was higher `horizon` seconds later,
+        # per volume_change_pct bucket of bucket_size %
+        rows = self.reader().execute(
+            "SELECT CAST(volume_change_pct / ? AS INTEGER) * ? AS bucket, COUNT(*) AS signals, "
+            "AVG(outcome_price > current_price) AS hit_rate FROM signals "
+            "WHERE outcome_price IS NOT NULL AND timestamp >= ? GROUP BY bucket ORDER BY bucket", (bucket_size, bucket_size, since))
+        return [dict(row) for row in rows]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the signal history")
+    parser.add_argument("--path", default="signals.db")
+    parser.add_argument("--symbol", help="list the signals of SYMBOL")
+    parser.add_argument("--hours", type=float, default=24, help="how far back to list signals")
+    parser.add_argument("--bucket", type=float, default=10, help="volume change bucket size in %% for the hit rate")
+    args = parser.parse_args()
+
+    store = SignalStore(args.path)
+    if args.symbol:
+        for signal in store.signals_for(args.symbol, time.time() - args.hours * 3600):
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(signal['timestamp']))} {signal['symbol']} {signal['interval']}: "
+                  f"volume +{signal['volume_change_pct']:.2f}%, price {signal['current_price']:.8f}, MA {signal['moving_average']:.8f}")
+    else:
+        for bucket in store.hit_rate_by_volume_change(args.bucket):
+            print(f"volume +{bucket['bucket']:.0f}%..{bucket['bucket'] + args.bucket:.0f}%: {bucket['signals']} signals, hit rate {bucket['hit_rate']:.2%}")
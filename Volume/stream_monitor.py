@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import deque
+
+import websockets
+
+if __name__ == "__main__":
+    # Run as a script: put the repository root on the path for the common package
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from crypto_monitor import (
+    build_signal, dashboard_port, fetch_24hr_ticker_price_change, fetch_klines_data, fetch_interval, kline_cache,
+    kline_intervals, load_dashboard, min_volume_increase_pct, quote_assets, save_html_file, signal_outcome_horizon,
+    signal_outcome_tolerance, signal_store
+)
+from dashboard_server import DashboardServer
+from html_template import SignalDashboard
+from records import Ticker
+from common.json_decoder import loads
+
+# Set the Binance combined stream endpoint
+stream_url = "wss://stream.binance.com:9443/stream?streams="
+all_market_ticker_stream = "!ticker@arr"
+
+# Set the number of kline streams per WebSocket connection (Binance allows up to 1024)
+max_streams_per_connection = 200
+
+# Compare the volume with the value from at least this many seconds ago (the polling mode compares snapshots fetch_interval apart)
+volume_lookback = fetch_interval
+
+# Do not signal the same symbol again for this many seconds
+signal_cooldown = fetch_interval
+
+# Write new signals to the HTML file at most once per this many seconds
+html_flush_interval = 1
+
+# Wait this many seconds before reconnecting a dropped stream
+reconnect_delay = 5
+
+class TickerTable:
+    # Live table of the latest 24hr ticker per symbol, plus a short history of
+    # quote volumes so the volume increase can be evaluated on every update
+    def __init__(self, lookback):
+        self.lookback = lookback
+        self.tickers = {}
+        self.volume_history = {}
+
+    def update(self, symbol, quote_volume, last_price, price_change_pct, event_time):
+        # Store the ticker and return the volume change in % against the newest
+        # sample at least `lookback` seconds old, or None if there is none yet
+        self.tickers[symbol] = Ticker(quote_volume, last_price, price_change_pct, event_time)
+
+        history = self.volume_history.get(symbol)
+        if history is None:
+            history = self.volume_history[symbol] = deque()
+        history.append((event_time, quote_volume))
+
+        while len(history) > 1 and event_time - history[1][0] >= self.lookback:
+            history.popleft()
+
+        base_time, base_volume = history[0]
+        if event_time - base_time < self.lookback or base_volume == 0:
+            return None
+        return (quote_volume - base_volume) / base_volume * 100
+
+class StreamMonitor:
+    def __init__(self, symbols, intervals, threshold, url=stream_url, port=dashboard_port):
+        self.symbols = set(symbols)
+        self.intervals = intervals
+        self.threshold = threshold
+        self.url = url
+        self.table = TickerTable(volume_lookback)
+        self.last_signal_times = {}
+        self.pending = set()
+        self.tasks = set()
+        self.new_signals = []
+        self.dashboard = SignalDashboard(fetch_interval)
+        self.port = port
+        self.dashboard_server = None
+
+    def handle_ticker(self, ticker):
+        symbol = ticker['s']
+        if symbol not in self.symbols:
+            return
+
+        # The event time is in milliseconds
+        event_time = ticker['E'] / 1000
+        volume_change_pct = self.table.update(symbol, float(ticker['q']), float(ticker['c']), float(ticker['P']), event_time)
+
+        if volume_change_pct is None or volume_change_pct < self.threshold or symbol in self.pending:
+            return
+        if event_time - self.last_signal_times.get(symbol, 0) < signal_cooldown:
+            return
+
+        self.pending.add(symbol)
+        task = asyncio.get_running_loop().create_task(self.evaluate(symbol, volume_change_pct))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def handle_kline(self, event):
+        kline = event['k']
+        kline_cache.update_kline(event['s'], kline['i'], kline['t'], float(kline['c']), kline['T'])
+
+    async def moving_average(self, symbol, interval, current_price):
+        # Kline streams keep seeded series current; only a missing or stale series
+        # is downloaded, off the event loop
+        start_times = kline_cache.missing_start_times([symbol], interval)
+        if start_times:
+            klines_data = await asyncio.to_thread(fetch_klines_data, symbol, interval, start_times[symbol])
+            if klines_data:
+                kline_cache.update(symbol, interval, klines_data, replace=start_times[symbol] is None)
+
+        kline_cache.update_last_price(symbol, interval, current_price)
+        return kline_cache.moving_average(symbol, interval)
+
+    async def evaluate(self, symbol, volume_change_pct):
+        try:
+            ticker = self.table.tickers[symbol]
+            current_price, price_change_pct, event_time = ticker.last_price, ticker.price_change_pct, ticker.event_time
+            moving_averages = await asyncio.gather(*(self.moving_average(symbol, interval, current_price) for interval in self.intervals))
+
+            for interval, moving_average in zip(self.intervals, moving_averages):
+                if moving_average and current_price > moving_average:
+                    self.last_signal_times[symbol] = event_time
+                    self.new_signals.append(build_signal(symbol, interval, volume_change_pct, price_change_pct, moving_average, current_price))
+                    print(f"{symbol}: volume +{volume_change_pct:.2f}%, price {current_price} above {interval} MA {moving_average}")
+        finally:
+            self.pending.discard(symbol)
+
+    def handle_message(self, message):
+        payload = loads(message)
+        data = payload.get('data', payload)
+
+        if isinstance(data, list):
+            for ticker in data:
+                self.handle_ticker(ticker)
+        elif data.get('e') == 'kline':
+            self.handle_kline(data)
+
+    async def consume(self, streams):
+        url = self.url + "/".join(streams)
+        while True:
+            try:
+                async with websockets.connect(url, max_size=None) as websocket:
+                    async for message in websocket:
+                        self.handle_message(message)
+            except (OSError, websockets.WebSocketException) as e:
+                print(f"Stream connection lost ({e}), reconnecting in {reconnect_delay} seconds...")
+            await asyncio.sleep(reconnect_delay)
+
+    async def flush_signals(self):
+        last_resolve_time = 0
+        while True:
+            await asyncio.sleep(html_flush_interval)
+            if time.time() - last_resolve_time >= fetch_interval:
+                last_resolve_time = time.time()
+                kline_cache.evict()
+                signal_store.resolve({symbol: ticker.last_price for symbol, ticker in self.table.tickers.items()}, signal_outcome_horizon,
+                                     signal_outcome_tolerance)
+
+            if self.new_signals:
+                signal_store.add(self.new_signals)
+                signal_section = self.dashboard.add(self.new_signals)
+                self.new_signals = []
+
+                save_html_file(self.dashboard.render())
+                if self.dashboard_server:
+                    self.dashboard_server.publish(signal_section)
+                print("Saved potential buy signals to HTML file")
+
+    async def run(self):
+        signal_store.start()
+        load_dashboard(self.dashboard)
+        if self.port:
+            self.dashboard_server = DashboardServer(self.dashboard, signal_store, port=self.port).start()
+
+        kline_streams = sorted(f"{symbol.lower()}@kline_{interval}" for symbol in self.symbols for interval in self.intervals)
+        stream_groups = [[all_market_ticker_stream]] + [
+            kline_streams[i:i + max_streams_per_connection]
+            for i in range(0, len(kline_streams), max_streams_per_connection)
+        ]
+
+        tasks = [asyncio.create_task(self.consume(streams)) for streams in stream_groups]
+        tasks.append(asyncio.create_task(self.flush_signals()))
+        await asyncio.gather(*tasks)
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream Binance tickers and klines and detect potential buy signals")
+    parser.add_argument("--url", default=stream_url, help="combined stream URL prefix, e.g. a local replay server")
+    parser.add_argument("--port", type=int, default=dashboard_port, help="serve the live dashboard on this port")
+    args = parser.parse_args()
+
+    # Take the symbol universe from one REST snapshot, then follow the streams
+    symbols = [symbol for symbol in fetch_24hr_ticker_price_change()["symbol"] if symbol.endswith(tuple(quote_assets))]
+    print(f"Streaming {len(symbols)} {'/'.join(quote_assets)} pairs on {', '.join(kline_intervals)}...")
+
+    monitor = StreamMonitor(symbols, kline_intervals, min_volume_increase_pct, args.url, args.port)
+    asyncio.run(monitor.run())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import numpy as np
+
+from common.json_decoder import Schema
+
+# The 24hr ticker fields the monitor reads; the rest of the payload is skipped
+ticker_schema = Schema("Ticker24hr", [
+    ("symbol", "symbol", str), ("quote_volume", "quoteVolume", float), ("last_price", "lastPrice", float),
+    ("price_change_pct", "priceChangePercent", float)
+])
+
+class SymbolIndex:
+    # Persistent symbol -> row mapping, so the columns of snapshots taken in
+    # different cycles line up row by row. quote_assets is one quote asset or a
+    # tuple of them, e.g. ("BTC", "USDT")
+    def __init__(self, quote_assets="BTC"):
+        self.quote_assets = quote_assets
+        self.rows = {}
+        self.symbols = []
+        self.quote_mask = np.zeros(0, dtype=bool)
+        self.last_symbols = None
+        self.last_rows = None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def rows_for(self, symbols):
+        # The exchange returns symbols in a stable order, so consecutive snapshots
+        # usually map to exactly the same rows
+        if symbols == self.last_symbols:
+            return self.last_rows
+
+        rows = self.rows
+        new_symbols = [symbol for symbol in symbols if symbol not in rows]
+        if new_symbols:
+            for symbol in new_symbols:
+                rows[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+            new_mask = np.array([symbol.endswith(self.quote_assets) for symbol in new_symbols], dtype=bool)
+            self.quote_mask = np.concatenate([self.quote_mask, new_mask])
+        self.last_symbols = symbols
+        self.last_rows = np.fromiter((rows[symbol] for symbol in symbols), dtype=np.intp, count=len(symbols))
+        return self.last_rows
+
+    def quote_asset(self, symbol):
+        quote_assets = (self.quote_assets,) if isinstance(self.quote_assets, str) else self.quote_assets
+        return next((quote_asset for quote_asset in quote_assets if symbol.endswith(quote_asset)), None)
+
+class TickerSnapshot:
+    # One /api/v3/ticker/24hr snapshot (columns decoded with ticker_schema.decode_columns)
+    # held as float columns aligned to a SymbolIndex
+    def __init__(self, index, ticker_columns):
+        self.index = index
+        rows = index.rows_for(ticker_columns["symbol"])
+        size = len(index)
+
+        self.present = np.zeros(size, dtype=bool)
+        self.present[rows] = True
+        self.quote_volume = self._column(rows, size, ticker_columns["quote_volume"])
+        self.last_price = self._column(rows, size, ticker_columns["last_price"])
+        self.price_change_pct = self._column(rows, size, ticker_columns["price_change_pct"])
+
+    @staticmethod
+    def _column(rows, size, values):
+        column = np.full(size, np.nan)
+        column[rows] = values
+        return column
+
+    def __len__(self):
+        return len(self.present)
+
+    def aligned(self, size):
+        # Columns padded to `size` rows for symbols added to the index after this snapshot
+        pad = size - len(self.present)
+        if pad <= 0:
+            return self.present, self.quote_volume
+        return np.pad(self.present, (0, pad)), np.pad(self.quote_volume, (0, pad), constant_values=np.nan)
+
+def volume_spike_rows(current, previous, threshold):
+    # Rows of quote-asset symbols present in both snapshots whose quote volume
+    # grew by at least `threshold` %, with their volume change in %
+    size = len(current)
+    previous_present, previous_volume = previous.aligned(size)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume_change_pct = (current.quote_volume - previous_volume) / previous_volume * 100
+
+    mask = current.present & previous_present & (previous_volume != 0) & current.index.quote_mask[:size]
+    mask &= volume_change_pct >= threshold
+    rows = np.flatnonzero(mask)
+    return rows, volume_change_pct[rows]
+
+def above_moving_average(current, rows, moving_averages):
+    # Mask over `rows` of symbols trading above their moving average (missing MAs count as below)
+    moving_average = np.array([np.nan if ma is None else ma for ma in moving_averages], dtype=np.float64)
+    return current.last_price[rows] > moving_average
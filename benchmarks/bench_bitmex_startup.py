@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from stub_exchange import Fixtures, start_stub
+
+bitmex_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "bitmex")
+
+# Runs in a fresh interpreter: import the bot, then make its first trading decision
+# against the stub exchange given as argv[1]
+startup_script = """
+import sys, time, json
+sys.path.insert(0, '..')  # the repository root, for the common package
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+stub = sys.argv[1]
+main.api_instrument_url = stub + '/instrument'
+main.api_trade_bucketed_url = stub + '/trade/bucketed'
+
+market_data = main.get_market_data()
+ma_data = main.calculate_moving_averages()
+breakout_up, breakout_down = main.is_breakout(main.symbol, main.long_ma_period, market_data['last_price'])
+main.trading_decision(ma_data, main.get_sentiment_service(main.symbol).latest, breakout_up, breakout_down)
+decided = time.perf_counter()
+
+print(json.dumps({
+    'import_s': imported - start,
+    'first_decision_s': decided - start,
+    'nltk_imported': 'nltk' in sys.modules
+}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Bitmex bot's cold start: import and first decision")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None, help="fail if the median first decision is slower")
+    args = parser.parse_args()
+
+    server, stub_url = start_stub(Fixtures(1))
+
+    results = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, "-c", startup_script, stub_url], cwd=bitmex_dir,
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    server.shutdown()
+
+    import_times = sorted(result['import_s'] for result in results)
+    decision_times = sorted(result['first_decision_s'] for result in results)
+    median_decision = decision_times[len(decision_times) // 2]
+
+    print(f"import:         median {import_times[len(import_times) // 2] * 1000:8.1f} ms, max {import_times[-1] * 1000:8.1f} ms")
+    print(f"first decision: median {median_decision * 1000:8.1f} ms, max {decision_times[-1] * 1000:8.1f} ms")
+    print(f"NLTK imported before the first decision: {any(result['nltk_imported'] for result in results)}")
+
+    if args.max_seconds is not None and median_decision > args.max_seconds:
+        print(f"FAIL: median first decision {median_decision:.3f}s exceeds {args.max_seconds:.3f}s")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "test"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "Volume"))
+
+from common import json_decoder
+from stub_exchange import Fixtures, load_recording
+from symbol_universe import symbol_schema
+from ticker_columns import ticker_schema
+
+def payloads(num_symbols):
+    # The recorded 24hr ticker and exchangeInfo responses when there are any, padded
+    # to num_symbols like the stub exchange does, as the bytes the client receives
+    fixtures = Fixtures(num_symbols)
+    exchange_info = load_recording("exchange_info.json") or fixtures.exchange_info()
+    return {
+        "ticker_24hr": (json.dumps(fixtures.current).encode(), ticker_schema, None),
+        "exchangeInfo": (json.dumps(exchange_info).encode(), symbol_schema, "symbols"),
+    }
+
+def measure(func, repeat):
+    # Best wall time over `repeat` runs, then the peak traced allocation of one more run
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the JSON decoders on the large exchange payloads")
+    parser.add_argument("--symbols", type=int, default=3000, help="symbols in the ticker and exchangeInfo payloads")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'payload':<14} {'decoder':<26} {'best ms':>10} {'peak MiB':>9}")
+    for name, (data, schema, key) in payloads(args.symbols).items():
+        # What the callers did before: decode the bytes to a str, then parse everything
+        cases = [("json.loads(response.text)", lambda: json.loads(data.decode()))]
+        for backend in json_decoder.backends:
+            cases.append((f"{backend} loads", lambda backend=backend: (json_decoder.use_backend(backend), json_decoder.loads(data))))
+            cases.append((f"{backend} schema", lambda backend=backend: (json_decoder.use_backend(backend), schema.decode(data, key))))
+            cases.append((f"{backend} schema columns", lambda backend=backend: (json_decoder.use_backend(backend), schema.decode_columns(data, key))))
+
+        print(f"{name} ({len(data) / 2 ** 20:.2f} MiB)")
+        for label, func in cases:
+            seconds, peak = measure(func, args.repeat)
+            print(f"{'':<14} {label:<26} {seconds * 1000:>10.2f} {peak / 2 ** 20:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "test"))
+
+import numpy as np
+import pandas as pd
+
+from kline_store import KlineStore, klines_to_records
+
+hour_ms = 3_600_000
+
+def synthetic_klines(num_candles, seed):
+    # Rows shaped like /api/v3/klines responses, numbers as strings
+    rng = random.Random(seed)
+    price = rng.uniform(1e-6, 1e-2)
+    start = 1_600_000_000_000
+    klines = []
+
+    for i in range(num_candles):
+        open_price = price
+        price *= rng.uniform(0.98, 1.02)
+        open_time = start + i * hour_ms
+        volume = rng.uniform(0, 1e6)
+        klines.append([
+            open_time, f"{open_price:.8f}", f"{max(open_price, price) * 1.01:.8f}", f"{min(open_price, price) * 0.99:.8f}",
+            f"{price:.8f}", f"{volume:.8f}", open_time + hour_ms - 1, f"{volume * price:.8f}", rng.randint(0, 5000),
+            f"{volume / 2:.8f}", f"{volume * price / 2:.8f}", "0"
+        ])
+
+    return klines
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the JSON pair dumps with the binary kline store")
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument("--candles", type=int, default=5000)
+    args = parser.parse_args()
+
+    columns = ["Open time", "Open", "High", "Low", "Close", "Volume", "Close time", "Quote asset volume", "Number of trades", "Taker buy base asset volume", "Taker buy quote asset volume", "Ignore"]
+    pairs = {f"P{i:03d}BTC": synthetic_klines(args.candles, i) for i in range(args.pairs)}
+
+    with tempfile.TemporaryDirectory() as json_dir, tempfile.TemporaryDirectory() as store_dir:
+        # What scan_market used to write for every pair on every scan
+        start = time.perf_counter()
+        for pair, klines in pairs.items():
+            df = pd.DataFrame(klines, columns=columns)
+            df["Close"] = df["Close"].astype(float)
+            with open(os.path.join(json_dir, f"{pair}.json"), "w") as f:
+                json.dump(df.to_dict(), f)
+        json_write = time.perf_counter() - start
+
+        # Both reloads do the same work: the closes of every pair as a float array
+        # (summed, so the store's pages are actually read), then every column as a
+        # DataFrame
+        start = time.perf_counter()
+        json_totals = []
+        for pair in pairs:
+            with open(os.path.join(json_dir, f"{pair}.json")) as f:
+                json_totals.append(pd.DataFrame(json.load(f))["Close"].to_numpy(dtype=np.float64).sum())
+        json_read = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for pair in pairs:
+            with open(os.path.join(json_dir, f"{pair}.json")) as f:
+                pd.DataFrame(json.load(f))
+        json_frame = time.perf_counter() - start
+
+        store = KlineStore(store_dir)
+        start = time.perf_counter()
+        for pair, klines in pairs.items():
+            store.append(pair, klines_to_records(klines))
+        store_write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store_totals = []
+        for pair in pairs:
+            store_totals.append(np.asarray(store.load(pair)["close"], dtype=np.float64).sum())
+        store_read = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for pair in pairs:
+            pd.DataFrame(store.load(pair))
+        store_frame = time.perf_counter() - start
+
+        assert np.allclose(json_totals, store_totals)
+
+        # A rescan that only appends the newest candle of every pair
+        start = time.perf_counter()
+        for pair, klines in pairs.items():
+            store.append(pair, klines_to_records(klines[-1:]))
+        store_append = time.perf_counter() - start
+
+        json_size = directory_size(json_dir)
+        store_size = directory_size(store_dir)
+
+    print(f"{args.pairs} pairs x {args.candles} candles")
+    print(f"{'':14} {'JSON':>12} {'store':>12} {'ratio':>8}")
+    print(f"{'disk (MB)':14} {json_size / 1e6:12.2f} {store_size / 1e6:12.2f} {json_size / store_size:8.1f}")
+    print(f"{'write (s)':14} {json_write:12.3f} {store_write:12.3f} {json_write / store_write:8.1f}")
+    print(f"{'reload closes':14} {json_read:12.3f} {store_read:12.3f} {json_read / store_read:8.1f}")
+    print(f"{'reload frame':14} {json_frame:12.3f} {store_frame:12.3f} {json_frame / store_frame:8.1f}")
+    print(f"incremental append of one candle per pair: {store_append * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+for tool_dir in ("Volume", "test", "bitmex"):
+    sys.path.insert(0, os.path.join(benchmarks_dir, os.pardir, tool_dir))
+sys.path.insert(0, os.path.join(benchmarks_dir, os.pardir))
+
+import crypto_monitor
+import main as bitmex_main
+import test as scanner  # test/test.py, ahead of the standard library's test package on sys.path
+from common.http_client import ExchangeClient, RateLimiter
+from html_template import generate_html_content, SignalDashboard
+from kline_cache import KlineCache
+from kline_store import KlineStore, klines_to_records
+from signal_store import SignalStore
+from stub_exchange import Fixtures, start_stub
+from ticker_columns import SymbolIndex, TickerSnapshot, ticker_schema
+
+# Results are compared with this file by default; write it with --save-baseline
+baseline_path = os.path.join(benchmarks_dir, "baseline.json")
+
+def unlimited_client(base_url, pool_size):
+    # The stub has no request budget, so the benchmark is not throttled by one
+    return ExchangeClient(base_url, RateLimiter(10 ** 9), pool_size=pool_size)
+
+class Workload:
+    # One scale of the suite: the stub exchange serving num_symbols symbols, and the
+    # tools pointed at it with their caches and stores in a temporary directory
+    def __init__(self, num_symbols, work_dir):
+        self.num_symbols = num_symbols
+        self.fixtures = Fixtures(num_symbols)
+        self.server, self.url = start_stub(self.fixtures)
+
+        crypto_monitor.client = unlimited_client(self.url, crypto_monitor.max_concurrent_requests)
+        crypto_monitor.kline_cache = KlineCache(crypto_monitor.moving_average_window, max_series=2 * num_symbols * len(crypto_monitor.kline_intervals))
+        crypto_monitor.symbol_index = SymbolIndex(tuple(crypto_monitor.quote_assets))
+        crypto_monitor.signal_store = SignalStore(os.path.join(work_dir, f"signals_{num_symbols}.db")).start()
+        self.html_file = os.path.join(work_dir, "potential_buy_signals.html")
+        self.previous_snapshot = TickerSnapshot(crypto_monitor.symbol_index, ticker_schema.decode_columns(json.dumps(self.fixtures.previous)))
+        self.current_snapshot = TickerSnapshot(crypto_monitor.symbol_index, ticker_schema.decode_columns(json.dumps(self.fixtures.current)))
+        self.dashboard = SignalDashboard(crypto_monitor.fetch_interval)
+
+        scanner.client = unlimited_client(self.url, scanner.max_concurrent_requests)
+        scanner.kline_store = KlineStore(os.path.join(work_dir, f"pairs_{num_symbols}"))
+        self.pairs = [symbol for symbol in self.fixtures.symbols if symbol.endswith("BTC")]
+        for pair in self.pairs:
+            scanner.kline_store.append(pair, klines_to_records(self.fixtures.all_klines(pair)))
+        self.closes = [scanner.kline_store.load(pair)["close"] for pair in self.pairs]
+
+        self.signals = self.volume_filter()
+        batch_size = max(len(self.signals) // 5, 1)
+        self.signal_batches = [self.signals[i:i + batch_size] for i in range(0, len(self.signals), batch_size)][:5]
+
+    def close(self):
+        crypto_monitor.signal_store.flush()
+        self.server.shutdown()
+
+    def volume_filter(self):
+        # Kline cache warm from the first call on, as in every cycle after the first
+        return crypto_monitor.filter_symbols_with_potential_volume_increase(
+            self.current_snapshot, self.previous_snapshot, crypto_monitor.min_volume_increase_pct, crypto_monitor.kline_intervals)
+
+    def volume_moving_averages_cold(self):
+        crypto_monitor.kline_cache = KlineCache(crypto_monitor.moving_average_window, max_series=2 * self.num_symbols * len(crypto_monitor.kline_intervals))
+        return crypto_monitor.calculate_moving_averages(self.fixtures.symbols, crypto_monitor.kline_intervals)
+
+    def scanner_moving_averages(self):
+        return [scanner.calculate_moving_averages(closes) for closes in self.closes]
+
+    def scan_market(self):
+        # Stored history is current, so each pair costs one delta request and one analysis
+        with contextlib.redirect_stdout(io.StringIO()):
+            return scanner.scan_market(self.pairs, 1)
+
+    def html_content(self):
+        return generate_html_content(self.signal_batches, {}, crypto_monitor.fetch_interval)
+
+    def monitor_cycle(self):
+        # One polling cycle of crypto_monitor.main(): fetch, parse, filter, store, render, save
+        snapshot = TickerSnapshot(crypto_monitor.symbol_index, crypto_monitor.fetch_24hr_ticker_price_change())
+        signals = crypto_monitor.filter_symbols_with_potential_volume_increase(
+            snapshot, self.previous_snapshot, crypto_monitor.min_volume_increase_pct, crypto_monitor.kline_intervals)
+        crypto_monitor.signal_store.add(signals)
+        self.dashboard.add(signals)
+        crypto_monitor.save_html_file(self.dashboard.render(), self.html_file)
+        return signals
+
+    def bitmex_decision(self):
+        market_data = bitmex_main.get_market_data()
+        ma_data = bitmex_main.calculate_moving_averages()
+        breakout_up, breakout_down = bitmex_main.is_breakout(bitmex_main.symbol, bitmex_main.long_ma_period, market_data['last_price'])
+        return bitmex_main.trading_decision(ma_data, 0, breakout_up, breakout_down)
+
+def point_bitmex_at(url):
+    bitmex_main.client = unlimited_client(url, 4)
+    bitmex_main.api_instrument_url = url + "/instrument"
+    bitmex_main.api_trade_bucketed_url = url + "/trade/bucketed"
+
+def measure(func, repeat):
+    # Best wall time over `repeat` runs, then the peak traced allocation of one more run
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+def run_suite(scales, repeat):
+    # Returns one result per (case, scale); throughput is in items per second, the
+    # items being symbols, pairs, signal rows or decisions depending on the case
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for num_symbols in scales:
+            workload = Workload(num_symbols, work_dir)
+            cases = [
+                ("volume_filter", workload.volume_filter, num_symbols),
+                ("volume_moving_averages_cold", workload.volume_moving_averages_cold, num_symbols),
+                ("scanner_moving_averages", workload.scanner_moving_averages, len(workload.pairs)),
+                ("scan_market", workload.scan_market, len(workload.pairs)),
+                ("generate_html_content", workload.html_content, max(sum(len(batch) for batch in workload.signal_batches), 1)),
+                ("monitor_cycle", workload.monitor_cycle, num_symbols),
+            ]
+            if num_symbols == scales[0]:
+                point_bitmex_at(workload.url)
+                cases.append(("bitmex_decision", workload.bitmex_decision, 1))
+
+            for name, func, items in cases:
+                seconds, peak = measure(func, repeat)
+                result = {'case': name, 'symbols': num_symbols, 'items': items, 'seconds': seconds,
+                          'throughput': items / seconds, 'peak_mib': peak / 2 ** 20}
+                results.append(result)
+                print(f"{name:<28} {num_symbols:>6} {items:>6} {seconds * 1000:>10.2f} {result['throughput']:>12.0f} {result['peak_mib']:>9.2f}", flush=True)
+
+            workload.close()
+    return results
+
+def result_key(result):
+    return f"{result['case']}@{result['symbols']}"
+
+def compare(results, baseline, tolerance):
+    # Cases whose throughput dropped more than `tolerance` below the baseline
+    failures = []
+    for result in results:
+        expected = baseline.get(result_key(result))
+        if expected is not None and result['throughput'] < expected * (1 - tolerance):
+            failures.append(f"{result_key(result)}: {result['throughput']:.0f}/s, baseline {expected:.0f}/s")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the three tools against the local stub exchange")
+    parser.add_argument("--scales", default="100,1000,5000", help="comma-separated symbol counts")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (the best one is reported)")
+    parser.add_argument("--baseline", default=baseline_path, help="baseline throughputs to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop below the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--output", help="write the full results as JSON")
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(",")]
+    print(f"{'case':<28} {'symbols':>6} {'items':>6} {'best ms':>10} {'items/s':>12} {'peak MiB':>9}")
+    results = run_suite(scales, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update({result_key(result): round(result['throughput'], 1) for result in results})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved the baseline to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.tolerance)
+        if failures:
+            print("FAIL: throughput below the baseline")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        compared = sum(result_key(result) in baseline for result in results)
+        print(f"{compared} cases within {args.tolerance:.0%} of the baseline")
+
+if __name__ == "__main__":
+    main()
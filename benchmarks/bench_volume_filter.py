@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "Volume"))
+
+from common.json_decoder import loads
+from ticker_columns import SymbolIndex, TickerSnapshot, ticker_schema, volume_spike_rows
+
+def synthetic_snapshots(num_symbols, seed=42):
+    rng = random.Random(seed)
+    quotes = ["BTC", "USDT", "ETH", "BNB"]
+    previous, current = [], []
+
+    for i in range(num_symbols):
+        symbol = f"C{i:05d}{quotes[i % len(quotes)]}"
+        quote_volume = rng.uniform(0, 1000)
+        last_price = rng.uniform(1e-6, 1)
+        previous.append({'symbol': symbol, 'quoteVolume': f"{quote_volume:.8f}", 'lastPrice': f"{last_price:.8f}", 'priceChangePercent': f"{rng.uniform(-10, 10):.3f}"})
+        current.append({'symbol': symbol, 'quoteVolume': f"{quote_volume * rng.uniform(0.9, 1.3):.8f}", 'lastPrice': f"{last_price * rng.uniform(0.98, 1.02):.8f}", 'priceChangePercent': f"{rng.uniform(-10, 10):.3f}"})
+
+    return previous, current
+
+def loop_filter(ticker_data, previous_ticker_data, threshold):
+    # The per-symbol loop the Volume monitor used before the columnar filter (without the MA step)
+    candidates = []
+    ticker_data_dict = {ticker['symbol']: ticker for ticker in ticker_data}
+
+    for prev_ticker in previous_ticker_data:
+        symbol = prev_ticker['symbol']
+        prev_quote_volume = float(prev_ticker['quoteVolume'])
+
+        if symbol in ticker_data_dict and symbol.endswith('BTC'):
+            current_ticker = ticker_data_dict[symbol]
+            current_quote_volume = float(current_ticker['quoteVolume'])
+
+            if prev_quote_volume != 0:
+                volume_change_pct = (current_quote_volume - prev_quote_volume) / prev_quote_volume * 100
+
+                if volume_change_pct >= threshold:
+                    candidates.append((symbol, volume_change_pct, float(current_ticker['priceChangePercent']), float(current_ticker['lastPrice'])))
+
+    return candidates
+
+def columnar_filter(index, current_snapshot, previous_snapshot, threshold):
+    rows, volume_change_pct = volume_spike_rows(current_snapshot, previous_snapshot, threshold)
+    return rows, volume_change_pct, current_snapshot.price_change_pct[rows], current_snapshot.last_price[rows]
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-symbol and columnar volume-spike filters")
+    parser.add_argument("--symbols", type=int, default=3000)
+    parser.add_argument("--threshold", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    previous, current = synthetic_snapshots(args.symbols)
+
+    # In the monitor each snapshot is parsed once, when it is fetched, and the
+    # previous cycle's snapshot is reused, so one cycle costs one parse and one filter.
+    # Both parses start from the response bytes: the loop needs the whole document,
+    # the columnar parse decodes the ticker columns and aligns them to the index.
+    previous_body, current_body = json.dumps(previous).encode(), json.dumps(current).encode()
+    index = SymbolIndex("BTC")
+    previous_snapshot = TickerSnapshot(index, ticker_schema.decode_columns(previous_body))
+    parse_time, current_snapshot = best_of(args.repeat, lambda: TickerSnapshot(index, ticker_schema.decode_columns(current_body)))
+
+    loop_parse_time, current_tickers = best_of(args.repeat, loads, current_body)
+    loop_time, loop_result = best_of(args.repeat, loop_filter, current_tickers, loads(previous_body), args.threshold)
+    columnar_time, (rows, _, _, _) = best_of(args.repeat, columnar_filter, index, current_snapshot, previous_snapshot, args.threshold)
+
+    assert sorted(symbol for symbol, *_ in loop_result) == sorted(index.symbols[row] for row in rows)
+
+    print(f"{args.symbols} symbols, {len(rows)} candidates")
+    print(f"per-symbol parse:       {loop_parse_time * 1000:8.3f} ms")
+    print(f"per-symbol loop:        {loop_time * 1000:8.3f} ms")
+    print(f"columnar parse:         {parse_time * 1000:8.3f} ms")
+    print(f"columnar filter:        {columnar_time * 1000:8.3f} ms")
+    print(f"speedup (filter only):  {loop_time / columnar_time:8.1f}x")
+    print(f"speedup (parse+filter): {(loop_parse_time + loop_time) / (parse_time + columnar_time):8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+import argparse
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+if __name__ == "__main__":
+    # Run as a script: put the repository root on the path for the common package
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from common.http_client import (
+    binance_client, binance_used_weight_header, bitmex_client, bitmex_remaining_header, bitmex_request_limit
+)
+
+# Secret the stub checks BitMEX order signatures with (main.py's placeholder by default)
+default_api_secret = "api_secret"
+
+# Recorded exchange responses (see --record); synthetic ones are used when missing
+fixtures_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Request weight of the Binance endpoints (a ticker/price request for one symbol weighs 2)
+binance_weights = {"/api/v3/ticker/24hr": 80, "/api/v3/klines": 2, "/api/v3/exchangeInfo": 20, "/api/v3/ticker/price": 4}
+
+hour_ms = 3_600_000
+day_ms = 24 * hour_ms
+quote_assets = ["BTC", "USDT", "ETH", "BNB"]
+
+def load_recording(name):
+    path = os.path.join(fixtures_dir, name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def scaled(value, factor):
+    return f"{float(value) * factor:.8f}"
+
+class Fixtures:
+    # Binance and BitMEX responses for num_symbols symbols. Recorded tickers and
+    # klines are replicated under new symbol names (with their prices and volumes
+    # scaled) up to num_symbols; without a recording they are generated. Candles end
+    # at the current hour, so the newest one is still open like on the exchange.
+    def __init__(self, num_symbols, num_candles=200, seed=42):
+        self.rng = random.Random(seed)
+        self.num_candles = num_candles
+        self.now_ms = int(time.time() * 1000) // hour_ms * hour_ms
+        self.recorded_tickers = load_recording("ticker_24hr.json")
+        self.recorded_klines = load_recording("klines_1h.json")
+        self.recorded_buckets = load_recording("bitmex_trade_bucketed_1d.json")
+        self.recorded_instrument = load_recording("bitmex_instrument.json")
+
+        self.current = self.make_tickers(num_symbols)
+        self.previous = [dict(ticker, quoteVolume=scaled(ticker['quoteVolume'], 1 / self.rng.uniform(0.9, 1.3))) for ticker in self.current]
+        self.symbols = [ticker['symbol'] for ticker in self.current]
+        self.tickers_by_symbol = {ticker['symbol']: ticker for ticker in self.current}
+        self.klines_cache = {}
+
+    def make_tickers(self, num_symbols):
+        tickers = []
+        recorded = self.recorded_tickers or []
+        for i in range(num_symbols):
+            if recorded:
+                ticker = recorded[i % len(recorded)]
+                quote_asset = next((quote for quote in quote_assets if ticker['symbol'].endswith(quote)), quote_assets[0])
+                symbol = ticker['symbol'] if i < len(recorded) else f"{ticker['symbol'][:-len(quote_asset)]}{i}{quote_asset}"
+                factor = 1 if i < len(recorded) else self.rng.uniform(0.5, 2)
+                tickers.append(dict(ticker, symbol=symbol, lastPrice=scaled(ticker['lastPrice'], factor), quoteVolume=scaled(ticker['quoteVolume'], factor)))
+            else:
+                tickers.append({
+                    'symbol': f"C{i:05d}{quote_assets[i % len(quote_assets)]}",
+                    'quoteVolume': f"{self.rng.uniform(0, 1000):.8f}",
+                    'lastPrice': f"{self.rng.uniform(1e-6, 1):.8f}",
+                    'priceChangePercent': f"{self.rng.uniform(-10, 10):.3f}"
+                })
+        return tickers
+
+    def all_klines(self, symbol):
+        klines = self.klines_cache.get(symbol)
+        if klines is not None:
+            return klines
+
+        last_price = float(self.tickers_by_symbol[symbol]['lastPrice'])
+        start = self.now_ms - (self.num_candles - 1) * hour_ms
+        if self.recorded_klines:
+            # The recorded candles, rescaled to the ticker's price and moved to end now
+            recorded = self.recorded_klines[-self.num_candles:]
+            factor = last_price / float(recorded[-1][4])
+            klines = [[start + i * hour_ms, scaled(k[1], factor), scaled(k[2], factor), scaled(k[3], factor), scaled(k[4], factor),
+                       k[5], start + (i + 1) * hour_ms - 1, k[7], k[8], k[9], k[10], "0"] for i, k in enumerate(recorded)]
+        else:
+            rng = random.Random(symbol)
+            price = last_price
+            klines = []
+            for i in range(self.num_candles):
+                open_price = price
+                price *= rng.uniform(0.98, 1.02)
+                volume = rng.uniform(0, 1e6)
+                open_time = start + i * hour_ms
+                klines.append([
+                    open_time, f"{open_price:.8f}", f"{max(open_price, price) * 1.01:.8f}", f"{min(open_price, price) * 0.99:.8f}",
+                    f"{price:.8f}", f"{volume:.8f}", open_time + hour_ms - 1, f"{volume * price:.8f}", rng.randint(0, 5000),
+                    f"{volume / 2:.8f}", f"{volume * price / 2:.8f}", "0"
+                ])
+
+        self.klines_cache[symbol] = klines
+        return klines
+
+    def klines(self, symbol, limit=500, start_time=None, end_time=None):
+        klines = self.all_klines(symbol)
+        if start_time is not None:
+            klines = [k for k in klines if k[0] >= start_time][:limit]
+        else:
+            if end_time is not None:
+                klines = [k for k in klines if k[0] <= end_time]
+            klines = klines[-limit:]
+        return klines
+
+    def exchange_info(self):
+        symbols = []
+        for symbol in self.symbols:
+            quote_asset = next((quote for quote in quote_assets if symbol.endswith(quote)), "")
+            symbols.append({'symbol': symbol, 'status': 'TRADING', 'baseAsset': symbol[:-len(quote_asset)], 'quoteAsset': quote_asset})
+        return {'timezone': 'UTC', 'serverTime': self.now_ms, 'symbols': symbols}
+
+    def prices(self, symbols=None):
+        symbols = symbols or self.symbols
+        return [{'symbol': symbol, 'price': self.tickers_by_symbol[symbol]['lastPrice']} for symbol in symbols if symbol in self.tickers_by_symbol]
+
+    def bitmex_buckets(self, count, reverse=True):
+        if self.recorded_buckets:
+            buckets = self.recorded_buckets[:count] if reverse else self.recorded_buckets[-count:]
+        else:
+            rng = random.Random(1)
+            buckets = []
+            for i in range(count):
+                timestamp = time.strftime("%Y-%m-%dT00:00:00.000Z", time.gmtime((self.now_ms - i * day_ms) / 1000))
+                buckets.append({'timestamp': timestamp, 'symbol': 'XBTUSD', 'close': 30000 * rng.uniform(0.9, 1.1)})
+            if not reverse:
+                buckets.reverse()
+        return buckets
+
+    def bitmex_instrument(self):
+        return self.recorded_instrument or [{'symbol': 'XBTUSD', 'lastPrice': 30000.5, 'midPrice': 30000.25, 'bidPrice': 30000.0, 'askPrice': 30000.5}]
+
+class StubExchangeHandler(BaseHTTPRequestHandler):
+    # Keep-alive connections like the exchanges, so the clients' pools are exercised.
+    # Headers and body go out in separate writes, so Nagle's algorithm is off or
+    # every response on a reused connection waits for the client's delayed ACK
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def admit(self):
+        # Count the request against this minute's budget, reported in the exchanges'
+        # headers (the used weight for Binance, the remaining requests for BitMEX).
+        # While server.throttled_requests is above zero, requests are answered 429
+        # with server.retry_after; returns False for those
+        server = self.server
+        url = urlsplit(self.path)
+        with server.usage_lock:
+            minute = int(time.time() // 60)
+            if minute != server.usage_minute:
+                server.usage_minute, server.used_weight, server.bitmex_requests = minute, 0, 0
+            if url.path.startswith("/api/v3/"):
+                weight = 2 if url.path == "/api/v3/ticker/price" and "symbol=" in url.query else binance_weights.get(url.path, 1)
+                server.used_weight += weight
+                self.usage_headers = {binance_used_weight_header: str(server.used_weight)}
+            elif url.path.startswith("/api/v1/"):
+                server.bitmex_requests += 1
+                self.usage_headers = {bitmex_remaining_header: str(max(bitmex_request_limit - server.bitmex_requests, 0))}
+            else:
+                self.usage_headers = {}
+            throttled = server.throttled_requests > 0
+            if throttled:
+                server.throttled_requests -= 1
+
+        if throttled:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.usage_headers["Retry-After"] = str(server.retry_after)
+            self.send_json({'code': -1003, 'msg': "Too many requests."}, 429)
+        return not throttled
+
+    def end_headers(self):
+        for name, value in getattr(self, "usage_headers", {}).items():
+            self.send_header(name, value)
+        super().end_headers()
+
+    def do_GET(self):
+        if not self.admit():
+            return
+        fixtures = self.server.fixtures
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/api/v3/ticker/24hr":
+            data = fixtures.current
+        elif url.path == "/api/v3/klines":
+            start_time = int(query['startTime']) if 'startTime' in query else None
+            end_time = int(query['endTime']) if query.get('endTime') else None
+            data = fixtures.klines(query['symbol'], int(query.get('limit', 500)), start_time, end_time)
+        elif url.path == "/api/v3/exchangeInfo":
+            data = fixtures.exchange_info()
+        elif url.path == "/api/v3/ticker/price":
+            symbols = [query['symbol']] if 'symbol' in query else json.loads(query['symbols']) if 'symbols' in query else None
+            if symbols and any(symbol not in fixtures.tickers_by_symbol for symbol in symbols):
+                # Like Binance, one unknown symbol fails the whole request
+                self.send_json({'code': -1121, 'msg': "Invalid symbol."}, 400)
+                return
+            data = fixtures.prices(symbols)[0] if 'symbol' in query else fixtures.prices(symbols)
+        elif url.path.endswith("/trade/bucketed"):
+            data = fixtures.bitmex_buckets(int(query.get('count', 100)), query.get('reverse') == 'true')
+        elif url.path.endswith("/instrument"):
+            data = fixtures.bitmex_instrument()
+        elif url.path.endswith("/everything"):
+            # News API search; the headlines are whatever the caller put in server.articles
+            self.server.news_requests.append(query)
+            data = {'status': 'ok', 'totalResults': len(self.server.articles), 'articles': self.server.articles}
+        else:
+            self.send_error(404)
+            return
+
+        body = json.dumps(data).encode()
+        etag = None
+        if url.path == "/api/v3/exchangeInfo":
+            # Conditional requests, so a cached symbol universe can be revalidated
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, name, message):
+        self.send_json({'error': {'message': message, 'name': name}}, status)
+
+    def signed_body(self):
+        # The request body, or None after answering 401 like BitMEX when the
+        # signature over verb + path + expires + body does not match
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        expires = self.headers.get("api-expires", "")
+        expected = hmac.new(self.server.api_secret.encode(), (self.command + self.path + expires + body).encode(), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, self.headers.get("api-signature", "")):
+            self.send_error_json(401, "HTTPError", "Signature not valid.")
+            return None
+        if not expires.isdigit() or int(expires) < time.time():
+            self.send_error_json(401, "HTTPError", "This request has expired - `expires` is in the past.")
+            return None
+        return json.loads(body) if body else {}
+
+    def new_order(self, order):
+        # Accepted orders are kept in server.orders. An order with a non-positive
+        # price, or of an ordType in server.order_rejections, is rejected with a
+        # BitMEX error body; server.order_failures maps an ordType to a status
+        # answered with a non-JSON error page, like a failing gateway
+        if order.get('price') is not None and order['price'] <= 0:
+            return {'error': {'message': "Invalid price", 'name': "ValidationError"}}
+        if order.get('ordType') in self.server.order_rejections:
+            return {'error': {'message': self.server.order_rejections[order['ordType']], 'name': "ValidationError"}}
+        order = dict(order, orderID=f"stub-{next(self.server.order_ids)}", ordStatus='New')
+        self.server.orders[order['orderID']] = order
+        return order
+
+    def do_POST(self):
+        if not self.admit():
+            return
+        payload = self.signed_body()
+        if payload is None:
+            return
+        orders = payload['orders'] if self.path.endswith("/order/bulk") else [payload]
+        if not self.path.endswith(("/order", "/order/bulk")):
+            self.send_error(404)
+            return
+
+        failure = next((self.server.order_failures[order.get('ordType')] for order in orders if order.get('ordType') in self.server.order_failures), None)
+        if failure:
+            self.send_error(failure)
+            return
+
+        statuses = [self.new_order(order) for order in orders]
+        if self.path.endswith("/order/bulk"):
+            self.send_json(statuses)
+        else:
+            self.send_json(statuses[0], 400 if 'error' in statuses[0] else 200)
+
+    def do_DELETE(self):
+        if not self.admit():
+            return
+        payload = self.signed_body()
+        if payload is None:
+            return
+        order = self.server.orders.get(payload.get('orderID'))
+        if not self.path.endswith("/order") or order is None:
+            self.send_error_json(404, "NotFoundError", "Not Found")
+            return
+        order['ordStatus'] = 'Canceled'
+        self.send_json([order])
+
+    def log_message(self, format, *args):
+        pass
+
+class StubExchangeServer(ThreadingHTTPServer):
+    # A listen backlog well above the tools' concurrent connections; with the default
+    # of 5 the extra connects wait for SYN retransmits and the timings measure those
+    request_queue_size = 128
+    daemon_threads = True
+
+def start_stub(fixtures, api_secret=default_api_secret):
+    # Returns the running server and its base URL
+    server = StubExchangeServer(("127.0.0.1", 0), StubExchangeHandler)
+    server.fixtures = fixtures
+    server.api_secret = api_secret
+    server.orders = {}
+    server.order_ids = itertools.count(1)
+    server.order_failures = {}
+    server.order_rejections = {}
+    server.articles = []
+    server.news_requests = []
+    server.usage_lock = threading.Lock()
+    server.usage_minute = None
+    server.used_weight = 0
+    server.bitmex_requests = 0
+    server.throttled_requests = 0
+    server.retry_after = 1
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def record(binance_symbol="ETHBTC", bitmex_symbol="XBTUSD"):
+    # Store live responses as fixtures for the stub
+    binance = binance_client()
+    bitmex = bitmex_client("https://www.bitmex.com/api/v1")
+    recordings = {
+        "ticker_24hr.json": binance.get("/api/v3/ticker/24hr", weight=80).json(),
+        "exchange_info.json": binance.get("/api/v3/exchangeInfo", weight=20).json(),
+        "klines_1h.json": binance.get("/api/v3/klines", params={"symbol": binance_symbol, "interval": "1h", "limit": 1000}, weight=2).json(),
+        "bitmex_trade_bucketed_1d.json": bitmex.get(f"/trade/bucketed?binSize=1d&partial=false&symbol={bitmex_symbol}&count=500&reverse=true").json(),
+        "bitmex_instrument.json": bitmex.get(f"/instrument?symbol={bitmex_symbol}").json(),
+    }
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    for name, data in recordings.items():
+        with open(os.path.join(fixtures_dir, name), "w") as f:
+            json.dump(data, f)
+        print(f"Recorded {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Binance and BitMEX REST APIs")
+    parser.add_argument("--record", action="store_true", help=f"record live responses into {fixtures_dir}")
+    parser.add_argument("--symbols", type=int, default=1000, help="number of symbols to serve")
+    args = parser.parse_args()
+
+    if args.record:
+        record()
+        return
+
+    server, url = start_stub(Fixtures(args.symbols))
+    print(f"Serving {args.symbols} symbols on {url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
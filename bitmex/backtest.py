@@ -0,0 +1,231 @@
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+if __name__ == '__main__':
+    # Run as a script: put the repository root on the path for the common package
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from main import (
+    api_trade_bucketed_url, buy_threshold, client, long_ma_period, sell_threshold, short_ma_period,
+    stop_loss_percentage
+)
+from common.indicators import SMA, RollingMax, RollingMin
+
+# Bitmex returns at most this many bins per trade/bucketed request
+max_bins_per_request = 1000
+
+def download_candles(symbol, bin_size, file_name, start_time=None):
+    # Store the completed bins of a symbol as a timestamp,open,high,low,close CSV
+    rows = []
+    start = 0
+    while True:
+        url = f"{api_trade_bucketed_url}?binSize={bin_size}&partial=false&symbol={symbol}&count={max_bins_per_request}&start={start}"
+        if start_time:
+            url += f"&startTime={start_time}"
+        data = client.get(url).json()
+        rows.extend((d['timestamp'], d['open'], d['high'], d['low'], d['close']) for d in data if d['close'] is not None)
+        print(f"Downloaded {len(rows)} {bin_size} bins of {symbol}")
+        if len(data) < max_bins_per_request:
+            break
+        start += max_bins_per_request
+
+    with open(file_name, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "open", "high", "low", "close"])
+        writer.writerows(rows)
+
+def load_candles(file_name):
+    with open(file_name, newline="") as f:
+        rows = list(csv.DictReader(f))
+    return {column: np.array([float(row[column]) for row in rows]) for column in ("open", "high", "low", "close")}
+
+def load_sentiment(file_name, num_candles):
+    # One sentiment score per candle (a "score" column, aligned with the candle CSV).
+    # Extra scores are dropped; missing ones would misalign every later candle
+    with open(file_name, newline="") as f:
+        scores = np.array([float(row["score"]) for row in csv.DictReader(f)])
+    if len(scores) < num_candles:
+        raise ValueError(f"{file_name} has {len(scores)} sentiment scores for {num_candles} candles")
+    return scores[:num_candles]
+
+def window_means(closes, period):
+    # means[t] = mean of closes[t - period:t], i.e. of the `period` bins completed before bin t
+    means = np.full(len(closes), np.nan)
+    means[1:] = SMA.batch(closes[:-1], period)
+    return means
+
+def indicators(closes, long_period, short_period):
+    # The windows of calculate_moving_averages over the bins completed before each
+    # bin: the long MA over the newest long_period closes, the short MA over the
+    # oldest short_period of the last long + short - 1 closes, and the breakout
+    # high/low over the newest long_period closes
+    long_ma = window_means(closes, long_period)
+    short_ma = np.full(len(closes), np.nan)
+    short_ma[long_period - 1:] = window_means(closes, short_period)[:len(closes) - long_period + 1]
+
+    high = np.full(len(closes), np.nan)
+    low = np.full(len(closes), np.nan)
+    high[1:] = RollingMax.batch(closes[:-1], long_period)
+    low[1:] = RollingMin.batch(closes[:-1], long_period)
+    return long_ma, short_ma, high, low
+
+def signals(closes, long_ma, short_ma, high, low, buy_threshold, sell_threshold, sentiment=None):
+    # +1 where trading_decision would buy at the close of the bin, -1 where it would sell.
+    # Without a sentiment series the sentiment confirmation is skipped.
+    with np.errstate(invalid='ignore'):
+        buy = (short_ma > long_ma * (1 + buy_threshold)) & (closes > high)
+        sell = (short_ma < long_ma * (1 + sell_threshold)) & (closes < low)
+    if sentiment is not None:
+        buy &= sentiment > 0
+        sell &= sentiment < 0
+    return buy.astype(np.int8) - sell.astype(np.int8)
+
+def simulate(candles, signal, stop_percentage):
+    # Enter at the close of a signal bin, one position at a time, and exit on the
+    # trailing stop. Like the live TrailingStop peg, whose offset is fixed at
+    # stop_percentage * entry price when the order is sent, the stop trails the
+    # highest high since entry by that amount for longs (the lowest low for shorts).
+    # Only bins before the current one move it; it fills at the stop, or at the open
+    # on a gap through it
+    opens, highs, lows, closes = candles["open"], candles["high"], candles["low"], candles["close"]
+    trades = []
+    next_entry = 0
+
+    for entry in np.flatnonzero(signal):
+        if entry < next_entry or entry + 1 >= len(closes):
+            continue
+        side = int(signal[entry])
+        entry_price = closes[entry]
+
+        if side > 0:
+            extremes = np.maximum.accumulate(np.concatenate(([entry_price], highs[entry + 1:-1])))
+            stops = extremes - stop_percentage * entry_price
+            hit = lows[entry + 1:] <= stops
+        else:
+            extremes = np.minimum.accumulate(np.concatenate(([entry_price], lows[entry + 1:-1])))
+            stops = extremes + stop_percentage * entry_price
+            hit = highs[entry + 1:] >= stops
+
+        if hit.any():
+            k = int(np.argmax(hit))
+            exit_index = entry + 1 + k
+            exit_price = min(opens[exit_index], stops[k]) if side > 0 else max(opens[exit_index], stops[k])
+        else:
+            exit_index = len(closes) - 1
+            exit_price = closes[-1]
+
+        trades.append((entry, exit_index, side, entry_price, exit_price))
+        next_entry = exit_index + 1
+
+    return trades
+
+def trade_statistics(trades):
+    if not trades:
+        return {'trades': 0, 'total_return': 0.0, 'win_rate': 0.0, 'max_drawdown': 0.0}
+
+    trades = np.array([(side, entry_price, exit_price) for _, _, side, entry_price, exit_price in trades])
+    returns = np.where(trades[:, 0] > 0, trades[:, 2] / trades[:, 1] - 1, trades[:, 1] / trades[:, 2] - 1)
+    equity = np.cumprod(1 + returns)
+    drawdowns = 1 - equity / np.maximum.accumulate(np.maximum(equity, 1))
+    return {
+        'trades': len(returns),
+        'total_return': float(equity[-1] - 1),
+        'win_rate': float((returns > 0).mean()),
+        'max_drawdown': float(drawdowns.max())
+    }
+
+def backtest(candles, long_period, short_period, buy, sell, stop_percentage, sentiment=None):
+    long_ma, short_ma, high, low = indicators(candles["close"], long_period, short_period)
+    signal = signals(candles["close"], long_ma, short_ma, high, low, buy, sell, sentiment)
+    return trade_statistics(simulate(candles, signal, stop_percentage))
+
+# Candles of the sweep, loaded once per worker process
+worker_candles = None
+worker_sentiment = None
+
+def init_worker(candles, sentiment):
+    global worker_candles, worker_sentiment
+    worker_candles = candles
+    worker_sentiment = sentiment
+
+def run_parameters(parameter_sets):
+    # The grid is ordered by MA periods, so indicators and signals are reused
+    # across the thresholds and stops of a chunk
+    results = []
+    cached_indicators = {}
+    cached_signals = {}
+    closes = worker_candles["close"]
+
+    for parameters in parameter_sets:
+        long_period, short_period, buy, sell, stop_percentage = parameters
+        if (long_period, short_period) not in cached_indicators:
+            cached_indicators = {(long_period, short_period): indicators(closes, long_period, short_period)}
+        if parameters[:4] not in cached_signals:
+            cached_signals = {parameters[:4]: signals(closes, *cached_indicators[(long_period, short_period)], buy, sell, worker_sentiment)}
+        trades = simulate(worker_candles, cached_signals[parameters[:4]], stop_percentage)
+        results.append((parameters, trade_statistics(trades)))
+
+    return results
+
+def sweep(candles, grid, workers=None, sentiment=None, chunk_size=64):
+    # Backtest every combination of the grid, spread over worker processes
+    parameter_sets = [parameters for parameters in itertools.product(*grid) if parameters[1] < parameters[0]]
+    chunks = [parameter_sets[i:i + chunk_size] for i in range(0, len(parameter_sets), chunk_size)]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(candles, sentiment)) as executor:
+        for chunk_results in executor.map(run_parameters, chunks):
+            results.extend(chunk_results)
+    return results
+
+def parse_range(value, cast=float):
+    # "start:stop:step" (stop included) or a single value
+    if ":" not in value:
+        return [cast(value)]
+    start, stop, step = (float(part) for part in value.split(":"))
+    return [cast(round(x, 10)) for x in np.arange(start, stop + step / 2, step)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the Bitmex MA crossover + breakout + sentiment strategy")
+    parser.add_argument("candles", help="CSV of timestamp,open,high,low,close bins")
+    parser.add_argument("--download", metavar="SYMBOL", help="download the completed bins of SYMBOL into the CSV first")
+    parser.add_argument("--bin-size", default="1d", help="bin size to download (1m, 5m, 1h or 1d)")
+    parser.add_argument("--sentiment", help="CSV with one sentiment score per bin; without it the sentiment gate is off")
+    parser.add_argument("--long", default=str(long_ma_period), help="long MA periods, e.g. 10:60:5")
+    parser.add_argument("--short", default=str(short_ma_period), help="short MA periods, e.g. 5:30:5")
+    parser.add_argument("--buy", default=str(buy_threshold), help="buy thresholds, e.g. 0:0.05:0.01")
+    parser.add_argument("--sell", default=str(sell_threshold), help="sell thresholds, e.g. -0.05:0:0.01")
+    parser.add_argument("--stop", default=str(stop_loss_percentage), help="trailing stop percentages, e.g. 0.01:0.05:0.01")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--top", type=int, default=10, help="number of best parameter sets to print")
+    args = parser.parse_args()
+
+    if args.download:
+        download_candles(args.download, args.bin_size, args.candles)
+
+    candles = load_candles(args.candles)
+    try:
+        sentiment = load_sentiment(args.sentiment, len(candles["close"])) if args.sentiment else None
+    except ValueError as e:
+        parser.error(str(e))
+    grid = [parse_range(args.long, int), parse_range(args.short, int), parse_range(args.buy), parse_range(args.sell), parse_range(args.stop)]
+
+    start = time.time()
+    results = sweep(candles, grid, args.workers, sentiment)
+    elapsed = time.time() - start
+    print(f"Backtested {len(results)} parameter sets over {len(candles['close'])} bins in {elapsed:.1f} seconds ({len(results) / elapsed:.0f}/s) on {args.workers or os.cpu_count()} workers")
+
+    results.sort(key=lambda result: result[1]['total_return'], reverse=True)
+    print(f"{'long':>5} {'short':>5} {'buy':>7} {'sell':>7} {'stop':>6} {'trades':>7} {'return':>9} {'win rate':>9} {'max DD':>7}")
+    for (long_period, short_period, buy, sell, stop), stats in results[:args.top]:
+        print(f"{long_period:5d} {short_period:5d} {buy:7.3f} {sell:7.3f} {stop:6.3f} {stats['trades']:7d} {stats['total_return']:9.2%} {stats['win_rate']:9.2%} {stats['max_drawdown']:7.2%}")
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,18 @@
-import time
-import hmac
-import hashlib
+import os
+import sys
+
+if __name__ == '__main__':
+    # Run as a script: put the repository root on the path for the common package
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from common.http_client import bitmex_client
+from common.indicators import SMA, RollingMax, RollingMin
+from common.metrics import metrics
+from common.scheduler import Scheduler
 import requests
-import json
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
-from datetime import datetime, timedelta
+
+from sentiment import ArticleScores, SentimentService
+from order_gateway import OrderGateway
 
 # Set Bitmex API credentials
 api_key = 'api_key' # Replace with your own API key
@@ -16,8 +23,8 @@ api_base_url = 'https://testnet.bitmex.com/api/v1'
 api_orders_url = api_base_url + '/order'
 api_instrument_url = api_base_url + '/instrument'
 
-# Download NLTK data
-nltk.download('vader_lexicon')
+# Shared rate-limited BitMEX client with keep-alive connections
+client = bitmex_client(api_base_url)
 
 # Define trading parameters
 symbol = 'XBTUSD'
@@ -27,33 +34,37 @@ short_ma_period = 10
 buy_threshold = 0.01
 sell_threshold = -0.01
 
+# Define the instruments traded by the realtime runner (realtime.py), all in one process.
+# Each entry needs a symbol and may override the quantity, news keyword (default: the
+# symbol), moving average periods, thresholds and stop-loss percentage above, e.g.
+# {'symbol': 'ETHUSD', 'quantity': 10, 'keyword': 'ethereum', 'long_ma_period': 30}
+instruments = [
+    {'symbol': symbol, 'quantity': quantity},
+]
+
 # Risk management parameters
 stop_loss_percentage = 0.02  # 2% trailing stop-loss
 
 # Fundamental analysis parameters
 news_api_key = 'api_key'  # Replace with your own News API key
 news_base_url = 'https://newsapi.org/v2/everything'
+news_update_interval = 15 * 60  # 15 minutes in seconds
+
+# Define order gateway: signs requests with cached key material over the shared client
+use_bulk_orders = False  # Send the entry and its stop in one /order/bulk request instead of two concurrent ones
+order_gateway = OrderGateway(client, api_key, api_secret, use_bulk_orders)
+
+# Define metrics export: Prometheus-style endpoint port and/or JSON dump file (both None to disable)
+metrics_port = None
+metrics_dump_file = None
 
 # Define authentication function
 def authenticate():
-    expires = str(int(round(time.time())) + 5)
-    verb = 'GET'
-    path = '/api/v1/order'
-    data = ''
-    message = verb + path + expires + data
-    signature = hmac.new(api_secret.encode(), message.encode(), digestmod=hashlib.sha256).hexdigest()
-    headers = {
-        'api-expires': expires,
-        'api-key': api_key,
-        'api-signature': signature,
-        'Content-Type': 'application/json'
-    }
-    print(f'message: {message}, signature: {signature}')
-    return headers
+    return order_gateway.sign('GET', '/api/v1/order')
 
 # Define function to get market data
 def get_market_data():
-    response = requests.get(api_instrument_url + '?symbol=' + symbol)
+    response = client.get(api_instrument_url + '?symbol=' + symbol)
     data = response.json()[0]
     return {'last_price': data['lastPrice'], 'mid_price': data['midPrice'], 'buy_price': data['bidPrice'], 'sell_price': data['askPrice']}
 
@@ -61,42 +72,50 @@ api_trade_bucketed_url = api_base_url + '/trade/bucketed'
 
 # Define function to calculate moving averages
 def calculate_moving_averages():
-    response = requests.get(api_trade_bucketed_url + '?binSize=1d&partial=false&symbol=' + symbol + '&count=' + str(long_ma_period + short_ma_period - 1 + 50) + '&reverse=true')
+    response = client.get(api_trade_bucketed_url + '?binSize=1d&partial=false&symbol=' + symbol + '&count=' + str(long_ma_period + short_ma_period - 1 + 50) + '&reverse=true')
     data = response.json()
     close_key = 'close' if 'close' in data[0] else 'lastPrice'
-    long_ma = sum([d[close_key] for d in data[:long_ma_period]]) / long_ma_period
-    short_ma = sum([d[close_key] for d in data[long_ma_period - 1:long_ma_period + short_ma_period - 1]]) / short_ma_period
-    return {'long_ma': long_ma, 'short_ma': short_ma}
+    # Oldest first: the long MA ends at the newest close, the short MA at the oldest
+    # close of the long window
+    closes = [d[close_key] for d in reversed(data)]
+    long_ma = SMA.batch(closes, long_ma_period)[-1]
+    short_ma = SMA.batch(closes, short_ma_period)[len(closes) - long_ma_period]
+    return {'long_ma': float(long_ma), 'short_ma': float(short_ma)}
+
+# Define the trading rule: moving average crossover confirmed by news sentiment and a breakout
+def trading_decision(ma_data, news_sentiment, breakout_up, breakout_down, buy_threshold=buy_threshold, sell_threshold=sell_threshold):
+    if ma_data['short_ma'] > ma_data['long_ma'] * (1 + buy_threshold) and news_sentiment > 0 and breakout_up:
+        return 'Buy'
+    elif ma_data['short_ma'] < ma_data['long_ma'] * (1 + sell_threshold) and news_sentiment < 0 and breakout_down:
+        return 'Sell'
+    return None
+
+# Define function to get the news sentiment service of a keyword, shared by all callers.
+# All services share one article score cache and one News API session.
+sentiment_services = {}
+article_scores = ArticleScores()
+news_session = requests.Session()
+
+def get_sentiment_service(keyword):
+    service = sentiment_services.get(keyword)
+    if service is None:
+        service = sentiment_services[keyword] = SentimentService(keyword, news_api_key, news_base_url, news_update_interval,
+                                                                 scores=article_scores, session=news_session)
+    return service
 
 # Define function to get news sentiment
 def get_news_sentiment(keyword):
-    sentiment_analyzer = SentimentIntensityAnalyzer()
-    url = f"{news_base_url}?q={keyword}&apiKey={news_api_key}"
-    response = requests.get(url)
-    response_data = response.json()
-
-    if 'articles' not in response_data:
-        print(f"Error getting news articles: {response_data}")
-        return 0
-
-    articles = response_data['articles']
-    sentiments = []
-
-    for article in articles:
-        sentiment = sentiment_analyzer.polarity_scores(article['title'])
-        sentiments.append(sentiment['compound'])
-
-    avg_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0
-    return avg_sentiment
+    return get_sentiment_service(keyword).refresh()
 
 def is_breakout(symbol, period, last_price):
-    response = requests.get(api_instrument_url + '?symbol=' + symbol + '&count=' + str(period))
+    response = client.get(api_instrument_url + '?symbol=' + symbol + '&count=' + str(period))
     data = response.json()
     close_key = 'close' if 'close' in data[0] else 'lastPrice'
-    prices = [d[close_key] for d in data]
-
-    highest_price = max(prices)
-    lowest_price = min(prices)
+    highest = RollingMax(period)
+    lowest = RollingMin(period)
+    for d in data:
+        highest_price = highest.update(d[close_key])
+        lowest_price = lowest.update(d[close_key])
 
     breakout_up = last_price > highest_price
     breakout_down = last_price < lowest_price
@@ -104,85 +123,65 @@ def is_breakout(symbol, period, last_price):
     return breakout_up, breakout_down
 
 # Define function to place limit order with trailing stop-loss
-def place_limit_order_with_trailing_stop(side, price, stop_loss_percentage):
-    order_data = {'symbol': symbol, 'orderQty': quantity, 'price': price, 'ordType': 'Limit', 'side': side}
-    expires = str(int(round(time.time())) + 5)
-    verb = 'POST'
-    path = '/api/v1/order'
-    data = json.dumps(order_data)
-    message = verb + path + expires + data
-    signature = hmac.new(api_secret.encode(), message.encode(), digestmod=hashlib.sha256).hexdigest()
-    headers = {
-        'api-expires': expires,
-        'api-key': api_key,
-        'api-signature': signature,
-        'Content-Type': 'application/json'
-    }
-    response = requests.post(api_orders_url, headers=headers, json=order_data)
-    order_status = response.json()
+def place_limit_order_with_trailing_stop(side, price, stop_loss_percentage, symbol=symbol, quantity=quantity):
+    order_status, stop_order_status = order_gateway.place_with_trailing_stop(symbol, side, quantity, price, stop_loss_percentage)
     print(order_status)
-
-    if order_status.get("orderID"):
-        order_id = order_status["orderID"]
-        trailing_stop_data = {
-            'symbol': symbol,
-            'pegPriceType': 'TrailingStop',
-            'pegOffsetValue': -stop_loss_percentage * price,  # Negative for buy, positive for sell
-            'ordType': 'Stop',
-            'side': 'Sell' if side == 'Buy' else 'Buy',
-            'execInst': 'LastPrice',
-            'orderQty': quantity,
-        }
-        expires = str(int(round(time.time())) + 5)
-        verb = 'POST'
-        path = '/api/v1/order'
-        data = json.dumps(trailing_stop_data)
-        message = verb + path + expires + data
-        signature = hmac.new(api_secret.encode(), message.encode(), digestmod=hashlib.sha256).hexdigest()
-        headers = {
-            'api-expires': expires,
-            'api-key': api_key,
-            'api-signature': signature,
-            'Content-Type': 'application/json'
-        }
-        response = requests.post(api_orders_url, headers=headers, json=trailing_stop_data)
-        stop_order_status = response.json()
-        print(stop_order_status)
+    print(stop_order_status)
+    print(f"Order round trips: {order_gateway.timing_summary()}")
 
 # Define main function
 def main():
-    news_update_interval = 15 * 60  # 15 minutes in seconds
     loop_sleep_time = 10  # 10 seconds
-    news_counter = 0
-
-    while True:
-        # Get market data
-        market_data = get_market_data()
-        print(market_data)
-
-        # Calculate moving averages
-        ma_data = calculate_moving_averages()
-        print(ma_data)
-
-        # Get news sentiment every 15 minutes
-        if news_counter == 0:
-            news_sentiment = get_news_sentiment(symbol)
-            print(f"News sentiment: {news_sentiment}")
-
-        # Detect breakouts
-        breakout_up, breakout_down = is_breakout(symbol, long_ma_period, market_data['last_price'])
-        print(f"Breakout up: {breakout_up}, Breakout down: {breakout_down}")
-
-        # Place orders based on moving average crossover strategy, news sentiment, and breakouts
-        if ma_data['short_ma'] > ma_data['long_ma'] * (1 + buy_threshold) and news_sentiment > 0 and breakout_up:
-            place_limit_order_with_trailing_stop('Buy', market_data['buy_price'], stop_loss_percentage)
-
-        elif ma_data['short_ma'] < ma_data['long_ma'] * (1 + sell_threshold) and news_sentiment < 0 and breakout_down:
-            place_limit_order_with_trailing_stop('Sell', market_data['sell_price'], stop_loss_percentage)
-
-        # Sleep for some time before the next iteration
-        time.sleep(loop_sleep_time)
-        news_counter = (news_counter + loop_sleep_time) % news_update_interval
+    ma_update_interval = 60  # The daily bins behind the moving averages change slowly
+
+    sentiment_service = get_sentiment_service(symbol)
+    state = {'ma_data': None, 'news_updated': None}
+
+    metrics.configure(metrics_port, metrics_dump_file)
+
+    def update_moving_averages():
+        with metrics.timer("stage_seconds", loop="bitmex", stage="compute"):
+            state['ma_data'] = calculate_moving_averages()
+        print(state['ma_data'])
+
+    def evaluate_market():
+        with metrics.cycle("bitmex", loop_sleep_time):
+            # Get market data
+            with metrics.timer("stage_seconds", loop="bitmex", stage="fetch"):
+                market_data = get_market_data()
+            print(market_data)
+
+            # Read the latest moving averages and news sentiment
+            ma_data = state['ma_data']
+            news_sentiment = sentiment_service.latest
+            if sentiment_service.updated != state['news_updated']:
+                state['news_updated'] = sentiment_service.updated
+                print(f"News sentiment: {news_sentiment}")
+
+            # Detect breakouts
+            with metrics.timer("stage_seconds", loop="bitmex", stage="compute"):
+                breakout_up, breakout_down = is_breakout(symbol, long_ma_period, market_data['last_price'])
+            print(f"Breakout up: {breakout_up}, Breakout down: {breakout_down}")
+
+            # Place orders based on moving average crossover strategy, news sentiment, and breakouts
+            side = trading_decision(ma_data, news_sentiment, breakout_up, breakout_down)
+            if side is not None:
+                metrics.inc("orders_total", side=side)
+                with metrics.timer("stage_seconds", loop="bitmex", stage="order"):
+                    if side == 'Buy':
+                        place_limit_order_with_trailing_stop('Buy', market_data['buy_price'], stop_loss_percentage)
+
+                    elif side == 'Sell':
+                        place_limit_order_with_trailing_stop('Sell', market_data['sell_price'], stop_loss_percentage)
+
+    # Market data, moving averages and news sentiment are refreshed at their own fixed
+    # rates, concurrently; the market is evaluated every loop_sleep_time seconds
+    update_moving_averages()
+    scheduler = Scheduler()
+    scheduler.every(loop_sleep_time, evaluate_market)
+    scheduler.every(ma_update_interval, update_moving_averages, run_now=False)
+    scheduler.every(news_update_interval, sentiment_service.refresh, name="sentiment")
+    scheduler.run()
 
 if __name__ == '__main__':
     main()
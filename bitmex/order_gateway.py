@@ -0,0 +1,124 @@
+import hashlib
+import hmac
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+def placed(order_status):
+    # Whether an order status (a dict, an error body or None) is a live order
+    return isinstance(order_status, dict) and bool(order_status.get('orderID'))
+
+class OrderGateway:
+    # Signs and sends Bitmex order requests. The HMAC key schedule is computed once
+    # and copied per message, requests share the client's keep-alive connections,
+    # and an entry order is sent together with its protective trailing stop.
+    def __init__(self, client, api_key, api_secret, use_bulk_orders=False, expires_in=5):
+        self.client = client
+        self.api_key = api_key
+        self.hmac = hmac.new(api_secret.encode(), digestmod=hashlib.sha256)
+        self.base_path = urlsplit(client.base_url).path
+        self.use_bulk_orders = use_bulk_orders
+        self.expires_in = expires_in
+        self.timings = deque(maxlen=1000)
+        self.executor = ThreadPoolExecutor(max_workers=2)
+
+    def sign(self, verb, path, data=''):
+        # Bitmex signature: HMAC-SHA256 of verb + path (with query) + expires + body
+        expires = str(int(round(time.time())) + self.expires_in)
+        signature = self.hmac.copy()
+        signature.update((verb + path + expires + data).encode())
+        return {
+            'api-expires': expires,
+            'api-key': self.api_key,
+            'api-signature': signature.hexdigest(),
+            'Content-Type': 'application/json'
+        }
+
+    def request(self, verb, endpoint, payload=None):
+        # The body is serialized once and the exact bytes that were signed are sent
+        data = json.dumps(payload) if payload is not None else ''
+        headers = self.sign(verb, self.base_path + endpoint, data)
+
+        start = time.perf_counter()
+        response = self.client.request(verb, endpoint, headers=headers, data=data or None)
+        self.timings.append({'endpoint': f"{verb} {endpoint}", 'status': response.status_code, 'round_trip_ms': (time.perf_counter() - start) * 1000})
+        return response
+
+    def place_order(self, order):
+        return self.request('POST', '/order', order).json()
+
+    def cancel_order(self, order_id):
+        return self.request('DELETE', '/order', {'orderID': order_id}).json()
+
+    def place_with_trailing_stop(self, symbol, side, quantity, price, stop_loss_percentage):
+        # Returns the statuses of the entry and of its stop (None if it was not placed)
+        entry = {'symbol': symbol, 'orderQty': quantity, 'price': price, 'ordType': 'Limit', 'side': side}
+        trailing_stop = {
+            'symbol': symbol,
+            'pegPriceType': 'TrailingStop',
+            'pegOffsetValue': (-1 if side == 'Buy' else 1) * stop_loss_percentage * price,  # Negative for buy, positive for sell
+            'ordType': 'Stop',
+            'side': 'Sell' if side == 'Buy' else 'Buy',
+            'execInst': 'LastPrice,ReduceOnly',  # Can only close a position, never open one if it is left behind
+            'orderQty': quantity,
+        }
+
+        start = time.perf_counter()
+        if self.use_bulk_orders:
+            # Both orders in one request
+            statuses = self.request('POST', '/order/bulk', {'orders': [entry, trailing_stop]}).json()
+            if not isinstance(statuses, list):
+                statuses = [statuses, None]
+            order_status, stop_order_status = (statuses + [None, None])[:2]
+        else:
+            # Both orders in flight at once on separate pooled connections
+            stop_future = self.executor.submit(self.place_order, trailing_stop)
+            try:
+                order_status = self.place_order(entry)
+            except Exception:
+                # No usable answer for the entry (connection error, timeout, non-JSON
+                # error page): take the stop down again before giving up
+                self.cancel_stop(stop_future)
+                raise
+            try:
+                stop_order_status = stop_future.result()
+            except Exception:
+                # Same for the stop: the entry must not stay open without it
+                if placed(order_status):
+                    self.cancel_order(order_status['orderID'])
+                raise
+
+        order_status, stop_order_status = self.pair_up(order_status, stop_order_status)
+        self.timings.append({'endpoint': 'entry + trailing stop', 'status': placed(order_status), 'round_trip_ms': (time.perf_counter() - start) * 1000})
+        return order_status, stop_order_status
+
+    def pair_up(self, order_status, stop_order_status):
+        # An entry is never left without its stop, nor a stop without its entry: a
+        # stop whose entry was rejected is cancelled (and reported as None), and an
+        # entry whose stop was rejected is cancelled (and reported as cancelled)
+        if placed(stop_order_status) and not placed(order_status):
+            self.cancel_order(stop_order_status['orderID'])
+            stop_order_status = None
+        elif placed(order_status) and not placed(stop_order_status):
+            print(f"Trailing stop rejected ({stop_order_status}), cancelling entry {order_status['orderID']}")
+            canceled = self.cancel_order(order_status['orderID'])
+            order_status = canceled[0] if isinstance(canceled, list) and canceled else canceled
+        return order_status, stop_order_status
+
+    def cancel_stop(self, stop_future):
+        # Cancel the stop once it has been placed; a stop that failed itself needs nothing
+        try:
+            stop_order_status = stop_future.result()
+        except Exception:
+            return
+        if placed(stop_order_status):
+            self.cancel_order(stop_order_status['orderID'])
+
+    def timing_summary(self):
+        summary = {}
+        for timing in self.timings:
+            times = summary.setdefault(timing['endpoint'], [])
+            times.append(timing['round_trip_ms'])
+        return {endpoint: {'count': len(times), 'avg_ms': sum(times) / len(times), 'max_ms': max(times)} for endpoint, times in summary.items()}
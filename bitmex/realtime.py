@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import deque
+
+import websockets
+
+if __name__ == '__main__':
+    # Run as a script: put the repository root on the path for the common package
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from main import (
+    api_trade_bucketed_url, buy_threshold, client, get_sentiment_service, instruments, long_ma_period,
+    place_limit_order_with_trailing_stop, quantity, sell_threshold, short_ma_period, stop_loss_percentage,
+    trading_decision
+)
+from common.indicators import SMA, RollingMax, RollingMin
+from common.json_decoder import loads
+
+# Define Bitmex realtime endpoint
+realtime_url = 'wss://ws.testnet.bitmex.com/realtime'
+
+# Place at most one order per this many seconds (the polling loop ran every 10 seconds)
+order_cooldown = 10
+
+# Wait this many seconds before reconnecting a dropped feed
+reconnect_delay = 5
+
+# Subscribe to the feeds of at most this many instruments per WebSocket connection
+max_instruments_per_connection = 20
+
+class DailyMovingAverages:
+    # Same windows as calculate_moving_averages over the last long + short - 1 daily
+    # closes: the long MA over the newest long_ma_period closes, the short MA over
+    # the oldest short_ma_period, i.e. the short MA lags long_period - 1 closes behind.
+    def __init__(self, long_period, short_period):
+        self.closes = deque(maxlen=long_period + short_period - 1)
+        self.long_ma = SMA(long_period)
+        self.short_ma = SMA(short_period)
+
+    def ready(self):
+        return len(self.closes) == self.closes.maxlen
+
+    def append(self, close):
+        self.closes.append(close)
+        self.long_ma.update(close)
+        if len(self.closes) >= self.long_ma.window:
+            # The close that just became the oldest of the long window
+            self.short_ma.update(self.closes[-self.long_ma.window])
+
+    def values(self):
+        return {'long_ma': self.long_ma.value, 'short_ma': self.short_ma.value}
+
+class InstrumentState:
+    # Strategy state of one instrument: its quotes, daily moving averages, breakout
+    # levels and order throttling, O(long + short) memory. It holds no connection;
+    # RealtimeEngine feeds it the rows of its symbol. The sentiment service is
+    # shared with every instrument that has the same news keyword.
+    def __init__(self, symbol, quantity=quantity, keyword=None, long_ma_period=long_ma_period, short_ma_period=short_ma_period,
+                 buy_threshold=buy_threshold, sell_threshold=sell_threshold, stop_loss_percentage=stop_loss_percentage):
+        self.symbol = symbol
+        self.quantity = quantity
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+        self.stop_loss_percentage = stop_loss_percentage
+        self.bid_price = None
+        self.ask_price = None
+        self.moving_averages = DailyMovingAverages(long_ma_period, short_ma_period)
+        self.last_bin_timestamp = ''
+        self.breakout_high = None
+        self.breakout_low = None
+        self.highest_close = RollingMax(long_ma_period)
+        self.lowest_close = RollingMin(long_ma_period)
+        self.sentiment = get_sentiment_service(keyword or symbol)
+        self.last_order_time = 0
+        self.order_in_flight = False
+
+    def seed(self):
+        # Load the last completed daily bins over REST, oldest first
+        response = client.get(api_trade_bucketed_url + '?binSize=1d&partial=false&symbol=' + self.symbol + '&count=' + str(self.moving_averages.closes.maxlen) + '&reverse=true')
+        for trade_bin in reversed(loads(response.content)):
+            self.add_daily_close(trade_bin['timestamp'], trade_bin['close'])
+
+    def add_daily_close(self, timestamp, close):
+        if timestamp <= self.last_bin_timestamp:
+            return
+        self.last_bin_timestamp = timestamp
+        self.moving_averages.append(close)
+
+        # Breakout levels: highest and lowest of the last long_ma_period daily closes
+        self.breakout_high = self.highest_close.update(close)
+        self.breakout_low = self.lowest_close.update(close)
+
+    def update_quotes(self, rows):
+        # Only the bid and ask are kept from the instrument table's rows
+        for row in rows:
+            self.bid_price = row.get('bidPrice', self.bid_price)
+            self.ask_price = row.get('askPrice', self.ask_price)
+
+    def evaluate(self, last_price):
+        # Returns the (side, price) of the order to place, or None
+        if not self.moving_averages.ready() or self.breakout_high is None:
+            return None
+        if self.order_in_flight or time.time() - self.last_order_time < order_cooldown:
+            return None
+
+        breakout_up = last_price > self.breakout_high
+        breakout_down = last_price < self.breakout_low
+        news_sentiment = self.sentiment.latest
+        side = trading_decision(self.moving_averages.values(), news_sentiment, breakout_up, breakout_down, self.buy_threshold, self.sell_threshold)
+        if side is None:
+            return None
+
+        price = self.bid_price if side == 'Buy' else self.ask_price
+        if price is None:
+            return None
+
+        print(f"{self.symbol}: {side} signal at {last_price}: {self.moving_averages.values()}, news sentiment {news_sentiment}")
+        self.order_in_flight = True
+        self.last_order_time = time.time()
+        return side, price
+
+    def place_order(self, side, price):
+        try:
+            place_limit_order_with_trailing_stop(side, price, self.stop_loss_percentage, self.symbol, self.quantity)
+        finally:
+            self.order_in_flight = False
+
+class RealtimeEngine:
+    # Trades many instruments in one process on one event loop. The instrument,
+    # trade and tradeBin1d feeds of up to max_instruments_per_connection instruments
+    # share a WebSocket connection, and every message is dispatched to the states
+    # of the symbols it carries. REST calls share main's client and its connection
+    # pool, and news sentiment is refreshed by one background thread per keyword.
+    def __init__(self, instruments, url=realtime_url):
+        self.instruments = {instrument.symbol: instrument for instrument in instruments}
+        self.url = url
+        self.tasks = set()
+
+    def handle_message(self, message):
+        payload = loads(message)
+        table = payload.get('table')
+        if table not in ('instrument', 'trade', 'tradeBin1d'):
+            return
+
+        rows_by_symbol = {}
+        for row in payload.get('data', []):
+            rows_by_symbol.setdefault(row.get('symbol'), []).append(row)
+
+        for symbol, rows in rows_by_symbol.items():
+            instrument = self.instruments.get(symbol)
+            if instrument is None:
+                continue
+            if table == 'instrument':
+                instrument.update_quotes(rows)
+            elif table == 'tradeBin1d':
+                for row in rows:
+                    instrument.add_daily_close(row['timestamp'], row['close'])
+            else:
+                order = instrument.evaluate(rows[-1]['price'])
+                if order is not None:
+                    task = asyncio.get_running_loop().create_task(asyncio.to_thread(instrument.place_order, *order))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+
+    async def consume(self, symbols):
+        topics = ",".join(f"{table}:{symbol}" for symbol in symbols for table in ('instrument', 'trade', 'tradeBin1d'))
+        url = f"{self.url}?subscribe={topics}"
+        while True:
+            try:
+                async with websockets.connect(url) as websocket:
+                    async for message in websocket:
+                        self.handle_message(message)
+            except (OSError, websockets.WebSocketException) as e:
+                print(f"Realtime feed of {len(symbols)} instruments lost ({e}), reconnecting in {reconnect_delay} seconds...")
+            await asyncio.sleep(reconnect_delay)
+
+    async def run(self):
+        for instrument in self.instruments.values():
+            instrument.sentiment.start()
+        await asyncio.gather(*(asyncio.to_thread(instrument.seed) for instrument in self.instruments.values()))
+
+        symbols = list(self.instruments)
+        groups = [symbols[i:i + max_instruments_per_connection] for i in range(0, len(symbols), max_instruments_per_connection)]
+        await asyncio.gather(*(self.consume(group) for group in groups))
+
+def main():
+    parser = argparse.ArgumentParser(description="Event-driven Bitmex trading engine for one or many instruments")
+    parser.add_argument("--url", default=realtime_url, help="realtime WebSocket URL, e.g. a local stand-in")
+    parser.add_argument("--symbols", default=None, help="comma-separated symbols to trade with the default parameters (default: instruments in main.py)")
+    args = parser.parse_args()
+
+    configs = instruments
+    if args.symbols:
+        configs = [{'symbol': symbol} for symbol in args.symbols.split(",")]
+    print(f"Trading {len(configs)} instruments: {', '.join(config['symbol'] for config in configs)}")
+
+    asyncio.run(RealtimeEngine([InstrumentState(**config) for config in configs], args.url).run())
+
+if __name__ == '__main__':
+    main()
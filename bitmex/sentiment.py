@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import os
+import threading
+import time
+
+import requests
+
+# Local NLTK data directory searched for the VADER lexicon before the default
+# locations; fill it once with `python3 sentiment.py --download`
+nltk_data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+vader_lexicon_resource = 'sentiment/vader_lexicon.zip'
+
+# One analyzer for the whole process; creating it imports NLTK and loads the VADER
+# lexicon, so it happens on first use (in the sentiment thread), never at import
+analyzer = None
+analyzer_lock = threading.Lock()
+
+def get_analyzer():
+    # Returns None when the lexicon is not available locally; nothing is downloaded here
+    global analyzer
+    with analyzer_lock:
+        if analyzer is None:
+            import nltk
+            from nltk.sentiment import SentimentIntensityAnalyzer
+
+            if nltk_data_dir not in nltk.data.path:
+                nltk.data.path.insert(0, nltk_data_dir)
+            try:
+                nltk.data.find(vader_lexicon_resource)
+            except LookupError:
+                print(f"VADER lexicon not found, run `python3 sentiment.py --download` to store it in {nltk_data_dir}")
+                return None
+            analyzer = SentimentIntensityAnalyzer()
+        return analyzer
+
+def download_lexicon():
+    import nltk
+    nltk.download('vader_lexicon', download_dir=nltk_data_dir)
+
+def article_key(article):
+    return hashlib.sha1(f"{article.get('url')}\n{article['title']}".encode()).hexdigest()
+
+class ArticleScores:
+    # Compound scores by article key, each expiring at its own time. One instance can
+    # be shared by the services of several keywords, which often see the same articles.
+    def __init__(self):
+        self.scores = {}
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self.scores
+
+    def get(self, key):
+        entry = self.scores.get(key)
+        return None if entry is None else entry[0]
+
+    def put(self, key, score, expires):
+        with self.lock:
+            self.scores[key] = (score, expires)
+
+    def evict(self, now):
+        with self.lock:
+            for key in [key for key, (_, expires) in self.scores.items() if expires < now]:
+                del self.scores[key]
+
+class SentimentService:
+    # Average VADER compound score of the news headlines for a keyword. Scores are
+    # cached per article (URL + title hash) for `cache_ttl` seconds, so a refresh
+    # only scores headlines it has not seen. start() refreshes on a background
+    # thread; readers just take `latest`. Pass `scores` and `session` to share the
+    # score cache and the connections between keywords.
+    def __init__(self, keyword, api_key, base_url, refresh_interval=15 * 60, cache_ttl=24 * 3600, scores=None, session=None):
+        self.keyword = keyword
+        self.api_key = api_key
+        self.base_url = base_url
+        self.refresh_interval = refresh_interval
+        self.cache_ttl = cache_ttl
+        self.scores = ArticleScores() if scores is None else scores
+        self.latest = 0
+        self.updated = None
+        self.session = requests.Session() if session is None else session
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def fetch_articles(self):
+        response = self.session.get(self.base_url, params={'q': self.keyword, 'apiKey': self.api_key}, timeout=10)
+        response_data = response.json()
+
+        if 'articles' not in response_data:
+            print(f"Error getting news articles: {response_data}")
+            return None
+        return response_data['articles']
+
+    def score_new(self, articles):
+        # Returns the number of newly scored headlines, or None without a lexicon
+        sentiment_analyzer = get_analyzer()
+        if sentiment_analyzer is None:
+            return None
+
+        # Expired scores are dropped first, so their headlines are scored again
+        now = time.time()
+        self.scores.evict(now)
+        keyed_titles = ((article_key(article), article['title']) for article in articles)
+        new_articles = [(key, title) for key, title in keyed_titles if key not in self.scores]
+
+        for key, title in new_articles:
+            self.scores.put(key, sentiment_analyzer.polarity_scores(title)['compound'], now + self.cache_ttl)
+
+        return len(new_articles)
+
+    def refresh(self):
+        articles = self.fetch_articles()
+        if articles is None:
+            return self.latest
+
+        # Until the lexicon is available the sentiment stays neutral, which blocks no
+        # market data or decisions but also confirms no trade
+        if self.score_new(articles) is None:
+            return self.latest
+
+        sentiments = [self.scores.get(article_key(article)) for article in articles]
+        sentiments = [sentiment for sentiment in sentiments if sentiment is not None]
+        self.latest = sum(sentiments) / len(sentiments) if sentiments else 0
+        self.updated = time.time()
+        return self.latest
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.refresh()
+            except (requests.RequestException, ValueError) as e:
+                print(f"Error refreshing news sentiment: {e}")
+            self.stopped.wait(self.refresh_interval)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="News sentiment helpers")
+    parser.add_argument("--download", action="store_true", help=f"download the VADER lexicon into {nltk_data_dir}")
+    args = parser.parse_args()
+
+    if args.download:
+        download_lexicon()
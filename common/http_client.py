@@ -0,0 +1,161 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from common.metrics import metrics
+
+# Binance request weight budget per minute and the header reporting the weight used so far
+binance_api_url = "https://api.binance.com"
+binance_weight_limit = 6000
+binance_used_weight_header = "X-MBX-USED-WEIGHT-1M"
+
+# BitMEX REST requests per minute and the header reporting how many are left
+bitmex_request_limit = 120
+bitmex_remaining_header = "x-ratelimit-remaining"
+
+# Statuses worth retrying: rate limited (429), IP ban (418) and server errors
+retry_statuses = {418, 429, 500, 502, 503, 504}
+
+class RateLimiter:
+    # Token bucket refilled at capacity / period tokens per second. The exchange's
+    # own count (from the response headers) overrides ours when it is lower.
+    def __init__(self, capacity, period=60):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, cost=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                wait = max(self.blocked_until - now, (cost - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def sync(self, remaining):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, remaining)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class EndpointStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, elapsed, error):
+        self.count += 1
+        self.errors += error
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': self.total_time / self.count * 1000 if self.count else 0.0,
+            'max_ms': self.max_time * 1000
+        }
+
+class ExchangeClient:
+    # Keep-alive HTTP client for one exchange: pooled connections, a shared rate
+    # limiter kept in step with the exchange's headers, retries with exponential
+    # backoff and per-endpoint latency statistics
+    def __init__(self, base_url, limiter, pool_size=10, max_retries=3, backoff=0.5, timeout=10,
+                 used_weight_header=None, remaining_header=None):
+        self.base_url = base_url
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.used_weight_header = used_weight_header
+        self.remaining_header = remaining_header
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _update_limits(self, response):
+        headers = response.headers
+        if self.used_weight_header and self.used_weight_header in headers:
+            self.limiter.sync(self.limiter.capacity - int(headers[self.used_weight_header]))
+        if self.remaining_header and self.remaining_header in headers:
+            self.limiter.sync(int(headers[self.remaining_header]))
+        if response.status_code in (418, 429):
+            self.limiter.pause(float(headers.get("Retry-After", 60)))
+
+    def _record(self, endpoint, elapsed, error):
+        with self.stats_lock:
+            stats = self.stats.get(endpoint)
+            if stats is None:
+                stats = self.stats[endpoint] = EndpointStats()
+            stats.record(elapsed, error)
+        metrics.observe("api_request_seconds", elapsed, endpoint=endpoint)
+        if error:
+            metrics.inc("api_request_errors_total", endpoint=endpoint)
+
+    def request(self, method, path, params=None, weight=1, retries=None, **kwargs):
+        # Returns the last response, even an error one, so callers keep checking
+        # status codes as before; connection errors are raised after the last retry.
+        # Only GETs are retried by default, so an order is never sent twice.
+        url = path if path.startswith("http") else self.base_url + path
+        endpoint = f"{method} {urlsplit(url).path}"
+        kwargs.setdefault("timeout", self.timeout)
+        if retries is None:
+            retries = self.max_retries if method == "GET" else 0
+
+        for attempt in range(retries + 1):
+            self.limiter.acquire(weight)
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, params=params, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(endpoint, time.perf_counter() - start, True)
+                if attempt == retries:
+                    raise
+            else:
+                self._record(endpoint, time.perf_counter() - start, response.status_code >= 400)
+                self._update_limits(response)
+                if response.status_code not in retry_statuses or attempt == retries:
+                    return response
+
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def get(self, path, params=None, weight=1, **kwargs):
+        return self.request("GET", path, params=params, weight=weight, **kwargs)
+
+    def post(self, path, params=None, weight=1, **kwargs):
+        return self.request("POST", path, params=params, weight=weight, **kwargs)
+
+    def latency_summary(self):
+        with self.stats_lock:
+            return {endpoint: stats.summary() for endpoint, stats in self.stats.items()}
+
+def binance_client(base_url=binance_api_url, pool_size=10):
+    return ExchangeClient(base_url, RateLimiter(binance_weight_limit), pool_size=pool_size,
+                          used_weight_header=binance_used_weight_header)
+
+def bitmex_client(base_url, pool_size=4):
+    return ExchangeClient(base_url, RateLimiter(bitmex_request_limit), pool_size=pool_size,
+                          remaining_header=bitmex_remaining_header)
@@ -0,0 +1,195 @@
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Streaming indicators: each holds at most O(window) state and takes one new value
+# per update in O(1) (amortized for the rolling extremes). replace_last() (SMA, EMA,
+# Crossover) revises the newest value, for a candle that is still open; the rolling
+# extremes drop the values they can no longer return, so they take closed candles
+# only. The batch() static methods
+# compute the same series over a whole NumPy array at once, NaN until the first
+# full window.
+
+class SMA:
+    # Simple moving average of the last `window` values, kept as a running sum.
+    # `value` is the mean of the values seen so far until the window is full.
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window
+
+    @property
+    def value(self):
+        if not self.values:
+            return None
+        return self.total / len(self.values)
+
+    def clear(self):
+        self.values.clear()
+        self.total = 0.0
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        return self.value
+
+    def replace_last(self, value):
+        if not self.values:
+            return self.update(value)
+        self.total += value - self.values[-1]
+        self.values[-1] = value
+        return self.value
+
+    @staticmethod
+    def batch(values, window):
+        values = np.asarray(values, dtype=np.float64)
+        means = np.full(len(values), np.nan)
+        if len(values) >= window:
+            cumulative = np.concatenate(([0.0], np.cumsum(values)))
+            means[window - 1:] = (cumulative[window:] - cumulative[:-window]) / window
+        return means
+
+class EMA:
+    # Exponential moving average with smoothing 2 / (period + 1), seeded with the
+    # first value (pandas' ewm(span=period, adjust=False))
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value = None
+        self.previous = None
+        self.count = 0
+
+    @property
+    def ready(self):
+        return self.count >= self.period
+
+    def update(self, value):
+        self.previous = self.value
+        self.value = value if self.previous is None else self.previous + self.alpha * (value - self.previous)
+        self.count += 1
+        return self.value
+
+    def replace_last(self, value):
+        if self.value is None:
+            return self.update(value)
+        self.value = value if self.previous is None else self.previous + self.alpha * (value - self.previous)
+        return self.value
+
+    @staticmethod
+    def batch(values, period):
+        # Closed form of the recursion: ema[i] = decay^(i+1) * (seed + alpha * sum of
+        # values[j] / decay^(j+1) for j <= i), one cumsum per block. Blocks are short
+        # enough that decay^-(block) stays below 1e100, and each is seeded with the
+        # last EMA of the block before
+        values = np.asarray(values, dtype=np.float64)
+        emas = values.copy()
+        alpha = 2 / (period + 1)
+        decay = 1 - alpha
+        if len(values) and decay > 0:
+            block = max(int(100 * np.log(10) / -np.log(decay)), 1)
+            previous = values[0]
+            for start in range(0, len(values), block):
+                chunk = values[start:start + block]
+                powers = decay ** np.arange(1, len(chunk) + 1)
+                emas[start:start + len(chunk)] = powers * (previous + alpha * np.cumsum(chunk / powers))
+                previous = emas[start + len(chunk) - 1]
+        emas[:period - 1] = np.nan
+        return emas
+
+class RollingMax:
+    # Maximum of the last `window` values. The deque holds the candidates only, in
+    # decreasing order, so the maximum is always at its front.
+    reduce = staticmethod(np.max)
+
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self.candidates = deque()
+
+    @staticmethod
+    def dominates(value, other):
+        return value >= other
+
+    @property
+    def ready(self):
+        return self.count >= self.window
+
+    @property
+    def value(self):
+        return self.candidates[0][1] if self.candidates else None
+
+    def update(self, value):
+        candidates = self.candidates
+        while candidates and self.dominates(value, candidates[-1][1]):
+            candidates.pop()
+        candidates.append((self.count, value))
+        self.count += 1
+        while candidates[0][0] <= self.count - 1 - self.window:
+            candidates.popleft()
+        return candidates[0][1]
+
+    @classmethod
+    def batch(cls, values, window):
+        values = np.asarray(values, dtype=np.float64)
+        extremes = np.full(len(values), np.nan)
+        if len(values) >= window:
+            extremes[window - 1:] = cls.reduce(sliding_window_view(values, window), axis=1)
+        return extremes
+
+class RollingMin(RollingMax):
+    # Minimum of the last `window` values
+    reduce = staticmethod(np.min)
+
+    @staticmethod
+    def dominates(value, other):
+        return value <= other
+
+class Crossover:
+    # Crossing of a fast series over a slow one: `above` on the update where
+    # fast - slow turns positive after being <= 0, `below` where it turns negative
+    # after being >= 0. Updates with a missing value (None) never cross.
+    def __init__(self):
+        self.previous = None
+        self.current = None
+
+    @staticmethod
+    def difference(fast, slow):
+        return None if fast is None or slow is None else fast - slow
+
+    @property
+    def above(self):
+        return self.previous is not None and self.current is not None and self.current > 0 >= self.previous
+
+    @property
+    def below(self):
+        return self.previous is not None and self.current is not None and self.current < 0 <= self.previous
+
+    def update(self, fast, slow):
+        self.previous = self.current
+        self.current = self.difference(fast, slow)
+        return self.above, self.below
+
+    def replace_last(self, fast, slow):
+        self.current = self.difference(fast, slow)
+        return self.above, self.below
+
+    @staticmethod
+    def batch(fast, slow):
+        # Boolean arrays of the crossings above and below at each index
+        difference = np.asarray(fast, dtype=np.float64) - np.asarray(slow, dtype=np.float64)
+        above = np.zeros(len(difference), dtype=bool)
+        below = np.zeros(len(difference), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            above[1:] = (difference[1:] > 0) & (difference[:-1] <= 0)
+            below[1:] = (difference[1:] < 0) & (difference[:-1] >= 0)
+        return above, below
@@ -0,0 +1,96 @@
+import json
+from collections import namedtuple
+from operator import attrgetter, itemgetter
+
+import numpy as np
+
+# Optional faster decoders; the standard library one is always available
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Decoders in order of preference, and the one in use (see use_backend)
+backends = [name for name, module in (("msgspec", msgspec), ("orjson", orjson), ("json", json)) if module is not None]
+backend = backends[0]
+
+def use_backend(name):
+    global backend
+    if name not in backends:
+        raise ValueError(f"JSON backend {name} is not available (installed: {', '.join(backends)})")
+    backend = name
+
+def loads(data):
+    # Decode a whole document from the response bytes (or a str), without first
+    # decoding the bytes to a str as response.json() and response.text do
+    if backend == "msgspec":
+        return msgspec.json.decode(data)
+    if backend == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+class Schema:
+    # The fields a caller needs from a list of JSON objects, as (attribute, key, type)
+    # triples, with type str, int or float (numbers sent as strings are converted).
+    # decode() returns one record per object with just these attributes. With msgspec
+    # the records are typed Structs decoded straight from the bytes, skipping every
+    # other field; otherwise they are named tuples picked out of a full parse.
+    # decode_columns() returns the same fields column by column instead, numbers as
+    # NumPy arrays, for callers that only work on whole columns.
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.record = namedtuple(name, [attribute for attribute, _, _ in fields])
+        self.decoders = {}
+
+    def msgspec_decoder(self, key):
+        decoder = self.decoders.get(key)
+        if decoder is None:
+            record = msgspec.defstruct(self.name, [(attribute, kind, msgspec.field(name=json_key)) for attribute, json_key, kind in self.fields], gc=False)
+            target = list[record]
+            if key is not None:
+                target = msgspec.defstruct(self.name + "Document", [(key, target)])
+            decoder = self.decoders[key] = msgspec.json.Decoder(target, strict=False)
+        return decoder
+
+    def decode(self, data, key=None):
+        # `key` names the top-level field holding the list, e.g. "symbols" in exchangeInfo
+        if backend == "msgspec":
+            document = self.msgspec_decoder(key).decode(data)
+            return document if key is None else getattr(document, key)
+
+        document = loads(data)
+        items = document if key is None else document[key]
+        # Field by field rather than object by object: one itemgetter pass, then one
+        # conversion pass per numeric column
+        keys = [json_key for _, json_key, _ in self.fields]
+        rows = map(itemgetter(*keys), items) if len(keys) > 1 else ((item[keys[0]],) for item in items)
+        values = zip(*rows)
+        columns = [column if kind is str else list(map(kind, column)) for (_, _, kind), column in zip(self.fields, values)]
+        return list(map(self.record._make, zip(*columns)))
+
+    def decode_columns(self, data, key=None):
+        # Dict of attribute -> column: a list for str fields, a float64 / int64 array
+        # for numbers. Without msgspec no record is built at all; each column is
+        # read straight out of the parsed objects.
+        if backend == "msgspec":
+            records = self.decode(data, key)
+            return {attribute: self.column(kind, map(attrgetter(attribute), records), len(records)) for attribute, _, kind in self.fields}
+
+        document = loads(data)
+        return self.columns(document if key is None else document[key])
+
+    def columns(self, items):
+        # decode_columns() of already parsed objects, e.g. columns([]) for no data
+        return {attribute: self.column(kind, map(itemgetter(json_key), items), len(items)) for attribute, json_key, kind in self.fields}
+
+    @staticmethod
+    def column(kind, values, count):
+        if kind is str:
+            return list(values)
+        return np.fromiter(map(kind, values), np.float64 if kind is float else np.int64, count)
@@ -0,0 +1,222 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds, from a fast API call to a slow market scan
+default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+class Gauge:
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+class Histogram:
+    def __init__(self, buckets=default_buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+class Timer:
+    # Observes the time spent in a `with` block into a histogram
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+        self.histogram.observe(self.elapsed)
+        return False
+
+class CycleTimer(Timer):
+    # Times one iteration of a polling loop and records how much later than
+    # `interval` after the previous iteration it started
+    def __init__(self, registry, loop, interval):
+        super().__init__(registry.get(Histogram, "cycle_seconds", {'loop': loop}))
+        self.registry = registry
+        self.loop = loop
+        self.interval = interval
+
+    def __enter__(self):
+        super().__enter__()
+        last_start = self.registry.cycle_starts.get(self.loop)
+        if last_start is not None:
+            self.registry.set("cycle_overrun_seconds", max(self.start - last_start - self.interval, 0), loop=self.loop)
+        self.registry.cycle_starts[self.loop] = self.start
+        return self
+
+class NullTimer:
+    # What timer() returns while metrics are disabled: no clock reads, no locks
+    elapsed = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+null_timer = NullTimer()
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        registry = self.server.registry
+        if self.path == "/metrics":
+            body, content_type = registry.prometheus_text(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(registry.snapshot()), "application/json"
+        else:
+            self.send_error(404)
+            return
+
+        body = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class Registry:
+    # Counters, gauges and histograms keyed by name and labels. Disabled by default:
+    # every recording call then returns after one attribute check, so instrumented
+    # hot paths cost next to nothing until configure() turns metrics on.
+    def __init__(self):
+        self.enabled = False
+        self.metrics = {}
+        self.types = {}
+        self.lock = threading.Lock()
+        self.cycle_starts = {}
+        self.server = None
+
+    def get(self, kind, name, labels, **kwargs):
+        key = (name, label_key(labels))
+        metric = self.metrics.get(key)
+        if metric is None:
+            with self.lock:
+                metric = self.metrics.get(key)
+                if metric is None:
+                    metric = self.metrics[key] = kind(**kwargs)
+                    self.types[name] = kind
+        return metric
+
+    def inc(self, name, amount=1, **labels):
+        if self.enabled:
+            self.get(Counter, name, labels).inc(amount)
+
+    def set(self, name, value, **labels):
+        if self.enabled:
+            self.get(Gauge, name, labels).set(value)
+
+    def observe(self, name, value, **labels):
+        if self.enabled:
+            self.get(Histogram, name, labels).observe(value)
+
+    def timer(self, name, **labels):
+        if not self.enabled:
+            return null_timer
+        return Timer(self.get(Histogram, name, labels))
+
+    def cycle(self, loop, interval):
+        if not self.enabled:
+            return null_timer
+        return CycleTimer(self, loop, interval)
+
+    def snapshot(self):
+        metrics = {}
+        for (name, key), metric in list(self.metrics.items()):
+            labels = dict(key)
+            if isinstance(metric, Histogram):
+                value = {'count': metric.count, 'sum': metric.sum,
+                         'buckets': dict(zip([str(bound) for bound in metric.buckets] + ["+Inf"], metric.counts))}
+            else:
+                value = metric.value
+            metrics.setdefault(name, []).append({'labels': labels, 'value': value})
+        return {'timestamp': time.time(), 'metrics': metrics}
+
+    def prometheus_text(self):
+        lines = []
+        by_name = {}
+        for (name, key), metric in list(self.metrics.items()):
+            by_name.setdefault(name, []).append((key, metric))
+
+        for name in sorted(by_name):
+            kind = self.types[name]
+            lines.append(f"# TYPE {name} {kind.__name__.lower()}")
+            for key, metric in by_name[name]:
+                if kind is Histogram:
+                    cumulative = 0
+                    for bound, count in zip(list(metric.buckets) + ["+Inf"], metric.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{format_labels(key, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(key)} {metric.sum}")
+                    lines.append(f"{name}_count{format_labels(key)} {metric.count}")
+                else:
+                    lines.append(f"{name}{format_labels(key)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        # /metrics in the Prometheus text format, /metrics.json as JSON
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.registry = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Serving metrics on http://{host}:{self.server.server_port}/metrics")
+
+    def dump(self, file_name):
+        temp_file_name = file_name + ".tmp"
+        with open(temp_file_name, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temp_file_name, file_name)
+
+    def dump_periodically(self, file_name, interval):
+        def run():
+            while True:
+                time.sleep(interval)
+                self.dump(file_name)
+        threading.Thread(target=run, daemon=True).start()
+
+    def configure(self, port=None, dump_file=None, dump_interval=60):
+        # Metrics are only recorded when they are exported somewhere
+        self.enabled = bool(port or dump_file)
+        if port:
+            self.serve(port)
+        if dump_file:
+            self.dump_periodically(dump_file, dump_interval)
+
+# Process-wide registry shared by the HTTP clients and the monitor loops
+metrics = Registry()
@@ -0,0 +1,80 @@
+import math
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from common.metrics import metrics
+
+class Job:
+    def __init__(self, name, func, interval, next_run):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.next_run = next_run
+        self.running = False
+
+class Scheduler:
+    # Runs jobs at fixed rates on a thread pool. Deadlines are first run + n * interval,
+    # so the time a job takes never pushes its later runs back. A job is never run
+    # twice at once: ticks that pass while it is still running are skipped and
+    # coalesced into the next deadline.
+    def __init__(self, max_workers=4):
+        self.jobs = []
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = False
+
+    def every(self, interval, func, name=None, run_now=True):
+        now = time.monotonic()
+        job = Job(name or func.__name__, func, interval, now if run_now else now + interval)
+        with self.lock:
+            self.jobs.append(job)
+        self.wakeup.set()
+        return job
+
+    def run_job(self, job, deadline):
+        metrics.observe("scheduler_lag_seconds", time.monotonic() - deadline, job=job.name)
+        try:
+            job.func()
+        except Exception:
+            print(f"Job {job.name} failed:")
+            traceback.print_exc()
+        finally:
+            job.running = False
+            self.wakeup.set()
+
+    def submit_due(self, now):
+        # Starts the due jobs and returns the time of the next deadline
+        with self.lock:
+            for job in self.jobs:
+                if job.next_run > now:
+                    continue
+
+                deadline = job.next_run
+                if job.running:
+                    metrics.inc("scheduler_skipped_ticks_total", job=job.name)
+                else:
+                    job.running = True
+                    self.executor.submit(self.run_job, job, deadline)
+
+                # Next deadline on the original grid; deadlines already missed are skipped
+                missed = math.floor((now - deadline) / job.interval)
+                if missed:
+                    metrics.inc("scheduler_skipped_ticks_total", missed, job=job.name)
+                job.next_run = deadline + (missed + 1) * job.interval
+
+            return min((job.next_run for job in self.jobs), default=now + 1)
+
+    def run(self):
+        # Blocks until stop() is called
+        while not self.stopped:
+            next_run = self.submit_due(time.monotonic())
+            self.wakeup.wait(max(next_run - time.monotonic(), 0))
+            self.wakeup.clear()
+
+    def stop(self):
+        self.stopped = True
+        self.wakeup.set()
+        self.executor.shutdown(wait=False)
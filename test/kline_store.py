@@ -0,0 +1,78 @@
+import os
+import numpy as np
+
+# One fixed-size record per candle, in the column order of the Binance klines endpoint
+kline_dtype = np.dtype([
+    ("open_time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+    ("close_time", "<i8"),
+    ("quote_volume", "<f8"),
+    ("trades", "<i8"),
+    ("taker_buy_base_volume", "<f8"),
+    ("taker_buy_quote_volume", "<f8"),
+])
+
+def klines_to_records(klines):
+    # Convert rows from /api/v3/klines (numbers as strings) into typed records sorted by open time
+    records = np.empty(len(klines), dtype=kline_dtype)
+    for i, name in enumerate(kline_dtype.names):
+        records[name] = np.array([kline[i] for kline in klines], dtype=kline_dtype[name])
+    records.sort(order="open_time")
+    return records
+
+class KlineStore:
+    # Per-symbol binary files of kline records keyed by open time. New candles are
+    # appended in place and reads are zero-copy memory maps of the file.
+    def __init__(self, directory="pairs"):
+        self.directory = directory
+
+    def path(self, symbol):
+        return os.path.join(self.directory, f"{symbol}.klines")
+
+    def load(self, symbol):
+        path = self.path(symbol)
+        if not os.path.exists(path) or os.path.getsize(path) < kline_dtype.itemsize:
+            return np.empty(0, dtype=kline_dtype)
+        return np.memmap(path, dtype=kline_dtype, mode="r")
+
+    def last_open_time(self, symbol):
+        records = self.load(symbol)
+        return int(records["open_time"][-1]) if len(records) else None
+
+    def append(self, symbol, records, replace=False):
+        # Append the records newer than the stored ones. Stored candles with an
+        # open time at or after the first new record (e.g. a candle that was still
+        # open when it was written) are replaced, or all of them with replace=True.
+        if len(records) == 0:
+            return 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(symbol)
+        data = np.ascontiguousarray(records).tobytes()
+
+        if replace or not os.path.exists(path):
+            # A whole new history is written next to the file and swapped in, so a
+            # crash keeps the old one and open memory maps keep reading the old file
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            return len(records)
+
+        stored = self.load(symbol)
+        keep = int(np.searchsorted(stored["open_time"], records["open_time"][0])) if len(stored) else 0
+        del stored
+
+        # Overwrite from the first replaced candle on; the file only shrinks when
+        # fewer candles replace more, so maps of the stored candles stay backed
+        with open(path, "r+b") as f:
+            f.seek(keep * kline_dtype.itemsize)
+            f.write(data)
+            if f.tell() < os.fstat(f.fileno()).st_size:
+                f.truncate()
+
+        return len(records)
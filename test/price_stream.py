@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import websockets
+
+from common.json_decoder import loads
+
+# Set the Binance combined stream endpoint
+stream_url = "wss://stream.binance.com:9443/stream?streams="
+
+# Wait this many seconds before reconnecting a dropped stream
+reconnect_delay = 5
+
+class PriceStream:
+    # Follows the mini ticker streams of the watched pairs on a background thread
+    # and keeps their latest prices (in satoshis) in `prices`
+    def __init__(self, url=stream_url):
+        self.url = url
+        self.prices = {}
+        self.pairs = []
+        self.generation = 0
+        self.thread = None
+
+    def watch(self, pairs):
+        # Start streaming, or switch the stream over to a new list of pairs
+        self.pairs = list(pairs)
+        self.prices = {pair: price for pair, price in self.prices.items() if pair in self.pairs}
+        self.generation += 1
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+            self.thread.start()
+
+    def handle_message(self, message):
+        ticker = loads(message)['data']
+        self.prices[ticker['s']] = int(float(ticker['c']) * 1e8)  # convert to satoshis
+
+    async def consume(self, generation):
+        url = self.url + "/".join(f"{pair.lower()}@miniTicker" for pair in self.pairs)
+        async with websockets.connect(url) as websocket:
+            while generation == self.generation:
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+                self.handle_message(message)
+
+    async def run(self):
+        while True:
+            generation = self.generation
+            if not self.pairs:
+                await asyncio.sleep(1)
+                continue
+            try:
+                await self.consume(generation)
+            except (OSError, websockets.WebSocketException) as e:
+                print(f"Price stream connection lost ({e}), reconnecting in {reconnect_delay} seconds...")
+                await asyncio.sleep(reconnect_delay)
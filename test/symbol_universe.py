@@ -0,0 +1,88 @@
+import json
+import os
+import time
+
+from common.json_decoder import Schema
+
+# Fields kept from each exchangeInfo symbol
+symbol_schema = Schema("SymbolInfo", [("symbol", "symbol", str), ("status", "status", str), ("quote_asset", "quoteAsset", str)])
+
+class SymbolUniverse:
+    # The exchangeInfo symbol list, cached in a JSON file between runs. The document
+    # is only downloaded again once the cache is older than max_age, with the stored
+    # ETag / Last-Modified sent along so an unchanged document costs a 304 and no
+    # body. Each refresh reports the symbols added and removed since the last one;
+    # the first download, with no earlier universe to compare with, reports none.
+    def __init__(self, path="exchange_info.json", max_age=6 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self.symbols = {}
+        self.fetched_at = 0
+        self.etag = None
+        self.last_modified = None
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring the symbol cache {self.path}: {e}")
+            return
+        self.symbols = {symbol: tuple(info) for symbol, info in cache["symbols"].items()}
+        self.fetched_at = cache["fetched_at"]
+        self.etag = cache.get("etag")
+        self.last_modified = cache.get("last_modified")
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"fetched_at": self.fetched_at, "etag": self.etag, "last_modified": self.last_modified,
+                       "symbols": self.symbols}, f)
+        os.replace(temp_path, self.path)
+
+    def stale(self):
+        return time.time() - self.fetched_at >= self.max_age
+
+    def refresh(self, client, force=False):
+        # Returns the sorted lists of symbols added and removed (or no longer trading)
+        # since the previous universe, both empty when there is none
+        if not force and not self.stale():
+            return [], []
+
+        headers = {}
+        if self.symbols and self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.symbols and self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        response = client.get("/api/v3/exchangeInfo", weight=20, headers=headers)
+        if response.status_code == 304:
+            self.fetched_at = time.time()
+            self.save()
+            return [], []
+        if response.status_code != 200:
+            if not self.symbols:
+                raise ValueError(f"Error fetching exchange info: {response.text}")
+            print(f"Error refreshing exchange info, keeping the cached symbols: {response.status_code}")
+            return [], []
+
+        first_download = not self.symbols
+        previous = self.trading()
+        self.symbols = {info.symbol: (info.status, info.quote_asset) for info in symbol_schema.decode(response.content, key="symbols")}
+        self.fetched_at = time.time()
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        self.save()
+
+        if first_download:
+            return [], []
+        current = self.trading()
+        return sorted(current - previous), sorted(previous - current)
+
+    def trading(self, quote_asset=None):
+        # Symbols open for trading, optionally only those quoted in quote_asset
+        return {symbol for symbol, (status, quote) in self.symbols.items()
+                if status == "TRADING" and (quote_asset is None or quote == quote_asset)}
@@ -1,12 +1,62 @@
-import requests
 import pandas as pd
 import numpy as np
 import time
 import json
+import argparse
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+if __name__ == "__main__":
+    # Run as a script: put the repository root on the path for the common package
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from kline_store import KlineStore, klines_to_records
+from symbol_universe import SymbolUniverse
+
+from common.http_client import binance_client
+from common.indicators import SMA, Crossover
+from common.json_decoder import Schema, loads
+from common.metrics import metrics
+from common.scheduler import Scheduler
+
+# Maximum number of Binance requests in flight at once while scanning
+max_concurrent_requests = 8
+
+# Shared rate-limited Binance client, its connection pool sized to the request budget
+client = binance_client(pool_size=max_concurrent_requests)
+
+# Seconds between two price updates of the watched pairs
+price_update_interval = 5
+
+# Above this many pairs, all prices are fetched and filtered locally (same weight, shorter URL)
+max_symbols_per_price_request = 100
+
+# Typed on-disk kline history, one file per pair
+kline_store = KlineStore("pairs")
+
+# exchangeInfo symbols cached between runs, downloaded again at most every 6 hours
+symbol_universe = SymbolUniverse("exchange_info.json")
+
+# Fields read from the price tickers; the rest of the payload is skipped
+price_schema = Schema("Price", [("symbol", "symbol", str), ("price", "price", float)])
+
+# Moving average periods of the crossover
+short_ma_period = 10
+long_ma_period = 50
+
+# Streaming indicator state per pair, kept between rescans
+pair_indicators = {}
+
+# DataFrame column names for the kline record fields
+kline_columns = {
+    "open_time": "Open time", "open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume",
+    "close_time": "Close time", "quote_volume": "Quote asset volume", "trades": "Number of trades",
+    "taker_buy_base_volume": "Taker buy base asset volume", "taker_buy_quote_volume": "Taker buy quote asset volume"
+}
 
 def fetch_data_chunks(symbol, interval, limit, num_chunks):
-    url = "https://api.binance.com/api/v3/klines"
+    url = "/api/v3/klines"
     data_chunks = []
 
     for i in range(num_chunks):
@@ -17,11 +67,11 @@ def fetch_data_chunks(symbol, interval, limit, num_chunks):
             "endTime": None if i == 0 else int(data_chunks[-1][0][0]) - 1
         }
 
-        response = requests.get(url, params=params)
+        response = client.get(url, params=params, weight=2)
         if response.status_code != 200:
             raise ValueError(f"Error fetching data for {symbol}: {response.text}")
 
-        data_chunk = response.json()
+        data_chunk = loads(response.content)
         if not data_chunk:
             raise ValueError(f"Not enough historical data for {symbol}")
 
@@ -29,61 +79,169 @@ def fetch_data_chunks(symbol, interval, limit, num_chunks):
 
     return data_chunks
 
-def get_historical_data(symbol, num_chunks=1):
+def fetch_data_since(symbol, interval, limit, start_time):
+    url = "/api/v3/klines"
+    params = {
+        "symbol": symbol,
+        "interval": interval,
+        "limit": limit,
+        "startTime": start_time
+    }
+
+    response = client.get(url, params=params, weight=2)
+    if response.status_code != 200:
+        raise ValueError(f"Error fetching data for {symbol}: {response.text}")
+
+    return loads(response.content)
+
+def get_historical_klines(symbol, num_chunks=1):
+    # Syncs the stored history of the pair and returns its last num_chunks * limit candles.
+    # A stored pair only needs the candles since its last stored open time (that
+    # candle included, as it may have been stored while still open); new pairs
+    # and pairs with a gap longer than one request are backfilled in full.
     interval = "1h"
     limit = 1000
 
-    data_chunks = fetch_data_chunks(symbol, interval, limit, num_chunks)
-    data = [item for chunk in data_chunks for item in chunk]
+    last_open_time = kline_store.last_open_time(symbol)
+    data = None
+
+    if last_open_time is not None:
+        data = fetch_data_since(symbol, interval, limit, last_open_time)
+        if len(data) >= limit:
+            data = None
+
+    backfill = data is None
+    if backfill:
+        data_chunks = fetch_data_chunks(symbol, interval, limit, num_chunks)
+        data = [item for chunk in data_chunks for item in chunk]
+
+    # Chunks come newest first; the records are sorted by open time
+    kline_store.append(symbol, klines_to_records(data), replace=backfill)
+    return kline_store.load(symbol)[-num_chunks * limit:]
 
-    df = pd.DataFrame(data, columns=["Open time", "Open", "High", "Low", "Close", "Volume", "Close time", "Quote asset volume", "Number of trades", "Taker buy base asset volume", "Taker buy quote asset volume", "Ignore"])
-    df["Close"] = df["Close"].astype(float)
+def klines_to_dataframe(records):
+    return pd.DataFrame({column: records[field] for field, column in kline_columns.items()})
 
-    return df
+def get_historical_data(symbol, num_chunks=1):
+    return klines_to_dataframe(get_historical_klines(symbol, num_chunks))
 
-def calculate_moving_averages(df, short_period=10, long_period=50):
-    short_mavg = df["Close"].rolling(window=short_period).mean()
-    long_mavg = df["Close"].rolling(window=long_period).mean()
-    return short_mavg, long_mavg
+def calculate_moving_averages(closes, short_period=short_ma_period, long_period=long_ma_period):
+    # Batch mode over a whole close series, NaN until the first full window
+    return SMA.batch(closes, short_period), SMA.batch(closes, long_period)
 
 def moving_average_crossover(short_mavg, long_mavg):
-    crossover_above = short_mavg.iloc[-1] > long_mavg.iloc[-1] and short_mavg.iloc[-2] <= long_mavg.iloc[-2]
-    crossover_below = short_mavg.iloc[-1] < long_mavg.iloc[-1] and short_mavg.iloc[-2] >= long_mavg.iloc[-2]
-    return crossover_above, crossover_below
+    crossover_above, crossover_below = Crossover.batch(short_mavg[-2:], long_mavg[-2:])
+    return bool(crossover_above[-1]), bool(crossover_below[-1])
+
+class PairIndicators:
+    # Streaming short/long moving averages of one pair and their crossover. Each
+    # rescan feeds only the candles stored since the previous one, the last of
+    # which may have been revised (it was stored while still open).
+    def __init__(self, short_period=short_ma_period, long_period=long_ma_period):
+        self.short = SMA(short_period)
+        self.long = SMA(long_period)
+        self.crossover = Crossover()
+        self.last_open_time = None
+
+    def update(self, records):
+        open_times = records["open_time"]
+        start = 0
+        if self.last_open_time is not None:
+            start = int(np.searchsorted(open_times, self.last_open_time))
+            if start == len(open_times) or open_times[start] != self.last_open_time:
+                # The stored history was rewritten by a backfill: start over
+                self.__init__(self.short.window, self.long.window)
+                start = 0
+        if self.last_open_time is None:
+            # Candles older than the last long window (+1 for the crossover) do not matter
+            start = max(len(open_times) - self.long.window - 1, 0)
+
+        for open_time, close in zip(open_times[start:].tolist(), records["close"][start:].tolist()):
+            if open_time == self.last_open_time:
+                self.short.replace_last(close)
+                self.long.replace_last(close)
+                self.crossover.replace_last(*self.values())
+            else:
+                self.short.update(close)
+                self.long.update(close)
+                self.crossover.update(*self.values())
+            self.last_open_time = open_time
+
+        return self.crossover.above, self.crossover.below
+
+    def values(self):
+        # Averages of incomplete windows do not count, like pandas' rolling NaNs
+        return (self.short.value if self.short.ready else None, self.long.value if self.long.ready else None)
+
+class ScannedPair:
+    # What a scan keeps of a pair: the numbers, not a copy of its candles
+    __slots__ = ('timestamp', 'last_open_time', 'last_close', 'short_ma', 'long_ma')
+
+    def __init__(self, timestamp, last_open_time, last_close, short_ma, long_ma):
+        self.timestamp = timestamp
+        self.last_open_time = last_open_time
+        self.last_close = last_close
+        self.short_ma = short_ma
+        self.long_ma = long_ma
+
+def analyze_pair(trading_pair, records):
+    indicators = pair_indicators.get(trading_pair)
+    if indicators is None:
+        indicators = pair_indicators[trading_pair] = PairIndicators()
+    crossover_above, crossover_below = indicators.update(records)
+    return trading_pair, crossover_above, crossover_below
 
 def get_btc_pairs():
-    url = "https://api.binance.com/api/v3/exchangeInfo"
-    response = requests.get(url)
-    exchange_info = response.json()
+    # BTC pairs currently trading; delisted and halted pairs are left out
+    added, removed = symbol_universe.refresh(client)
+    if added or removed:
+        print(f"Symbol universe changed: {len(added)} added, {len(removed)} removed")
+    for trading_pair in removed:
+        pair_indicators.pop(trading_pair, None)
 
-    btc_pairs = [symbol_info["symbol"] for symbol_info in exchange_info["symbols"] if symbol_info["quoteAsset"] == "BTC"]
+    btc_pairs = sorted(symbol_universe.trading("BTC"))
 
     return btc_pairs
 
 def get_current_price(symbol):
-    url = f"https://api.binance.com/api/v3/ticker/price?symbol={symbol}"
-    response = requests.get(url)
+    url = "/api/v3/ticker/price"
+    response = client.get(url, params={"symbol": symbol}, weight=2)
     if response.status_code != 200:
         raise ValueError(f"Error fetching current price for {symbol}: {response.text}")
-    current_price_data = response.json()
+    current_price_data = loads(response.content)
     current_price = float(current_price_data["price"])
     return int(current_price * 1e8)  # convert to satoshis
 
+def get_current_prices(symbols):
+    # One bulk request for all watched pairs; prices are returned in satoshis
+    url = "/api/v3/ticker/price"
+    params = None
+    if len(symbols) <= max_symbols_per_price_request:
+        params = {"symbols": json.dumps(list(symbols), separators=(",", ":"))}
+
+    response = client.get(url, params=params, weight=4)
+    if response.status_code == 400 and params:
+        # The whole symbols request fails when one symbol is no longer listed; take
+        # all prices (the same weight) and filter them locally instead
+        print(f"Error fetching prices by symbol, fetching all prices: {response.text}")
+        response = client.get(url, weight=4)
+    if response.status_code != 200:
+        raise ValueError(f"Error fetching current prices: {response.text}")
+
+    wanted = set(symbols)
+    prices = [(item.symbol, item.price) for item in price_schema.decode(response.content) if item.symbol in wanted]
+    satoshis = (np.array([price for _, price in prices], dtype=np.float64) * 1e8).astype(np.int64)  # convert to satoshis
+    return dict(zip((symbol for symbol, _ in prices), satoshis.tolist()))
+
 def scan_market(btc_pairs, num_chunks):
+    # Downloads run on a thread pool (bounded by max_concurrent_requests); each pair
+    # is analyzed and reported as soon as its download finishes
     potential_price_increase = []
     skipped_pairs = {}
     scanned_data = {}
 
-    # Create pairs directory if it doesn't exist
-    if not os.path.exists("pairs"):
-        os.makedirs("pairs")
-
-    count = 0
-
+    pairs_to_scan = []
     for trading_pair in btc_pairs:
-        count += 1
-        print(f"Scanning pair {count}/{len(btc_pairs)}")
-
         # If the pair has been skipped before, skip it again
         if trading_pair in skipped_pairs:
             print(f"{trading_pair}: {skipped_pairs[trading_pair]}")
@@ -91,65 +249,107 @@ def scan_market(btc_pairs, num_chunks):
 
         # If the scanned data for the pair exists and is less than 30 minutes old, skip scanning it again
         if trading_pair in scanned_data:
-            time_since_scan = time.time() - scanned_data[trading_pair]["timestamp"]
+            time_since_scan = time.time() - scanned_data[trading_pair].timestamp
             if time_since_scan < 1800:
                 print(f"{trading_pair}: Skipped (data less than 30 minutes old)")
                 continue
 
-        try:
-            df = get_historical_data(trading_pair, num_chunks)
-        except ValueError as e:
-            skipped_pairs[trading_pair] = str(e)
-            print(f"{trading_pair}: {e}")
-            continue
+        pairs_to_scan.append(trading_pair)
+
+    count = 0
+    start_time = time.time()
 
-        short_mavg, long_mavg = calculate_moving_averages(df)
-        crossover_above, crossover_below = moving_average_crossover(short_mavg, long_mavg)
+    with ThreadPoolExecutor(max_workers=max_concurrent_requests) as download_pool:
+        downloads = {download_pool.submit(get_historical_klines, trading_pair, num_chunks): trading_pair for trading_pair in pairs_to_scan}
 
-        if crossover_above:
-            potential_price_increase.append(trading_pair)
+        for future in as_completed(downloads):
+            trading_pair = downloads[future]
+            count += 1
+            try:
+                records = future.result()
+            except ValueError as e:
+                skipped_pairs[trading_pair] = str(e)
+                print(f"{trading_pair}: {e}")
+                continue
 
-        # Save the scanned data to file
-        filename = f"pairs/{trading_pair}.json"
-        with open(filename, "w") as f:
-            json.dump(df.to_dict(), f)
+            # Only the candles stored since the previous scan go through the indicators
+            trading_pair, crossover_above, crossover_below = analyze_pair(trading_pair, records)
 
-        scanned_data[trading_pair] = {
-            "data": df.to_dict(),
-            "timestamp": time.time()
-        }
+            short_ma, long_ma = pair_indicators[trading_pair].values()
+            scanned_data[trading_pair] = ScannedPair(time.time(), int(records["open_time"][-1]), float(records["close"][-1]), short_ma, long_ma)
 
-    print("Scanning complete.")
-    return potential_price_increase
+            elapsed = time.time() - start_time
+            print(f"Scanned pair {count}/{len(pairs_to_scan)} {trading_pair} ({count / elapsed:.1f} pairs/s)")
 
+            if crossover_above:
+                potential_price_increase.append(trading_pair)
 
-def monitor_potential_price_increase(pairs, num_chunks):
-    last_market_scan_time = time.time()
-    while True:
-        print("\nMonitoring potential price increase for:")
-        for trading_pair in pairs:
-            try:
-                current_price = get_current_price(trading_pair)
-                print(f"{trading_pair}: Current price is {current_price / 1e8:.8f} BTC ({current_price:,} satoshis)")
-            except ValueError as e:
-                print(f"{trading_pair}: {e}")
+    print(f"Scanning complete: {count} pairs in {time.time() - start_time:.1f} seconds.")
+    return potential_price_increase
 
-        time_since_last_market_scan = time.time() - last_market_scan_time
-        if time_since_last_market_scan >= 1800:  # Re-scan the market every 30 minutes (1800 seconds)
-            print("\nRe-scanning the market...\n")
-            btc_pairs = get_btc_pairs()
-            pairs = scan_market(btc_pairs, num_chunks)
-            last_market_scan_time = time.time()
 
-        print("\nWaiting 60 seconds before updating prices...\n")
-        time.sleep(60)  # Sleep for 60 seconds
+def monitor_potential_price_increase(pairs, num_chunks, price_stream=None):
+    # Prices come from one bulk request per update, or from the price stream when given.
+    # Price updates and market rescans run as separate fixed-rate jobs, so a rescan
+    # does not hold up the price updates.
+    watched = {'pairs': pairs}
+    if price_stream:
+        price_stream.watch(pairs)
+
+    def update_prices():
+        with metrics.cycle("scanner", price_update_interval):
+            pairs = watched['pairs']
+            print("\nMonitoring potential price increase for:")
+            if price_stream:
+                current_prices = price_stream.prices
+            else:
+                try:
+                    with metrics.timer("stage_seconds", loop="scanner", stage="fetch"):
+                        current_prices = get_current_prices(pairs)
+                except ValueError as e:
+                    print(e)
+                    current_prices = {}
+
+            for trading_pair in pairs:
+                current_price = current_prices.get(trading_pair)
+                if current_price is None:
+                    print(f"{trading_pair}: No current price")
+                else:
+                    print(f"{trading_pair}: Current price is {current_price / 1e8:.8f} BTC ({current_price:,} satoshis)")
+
+    def rescan_market():
+        print("\nRe-scanning the market...\n")
+        btc_pairs = get_btc_pairs()
+        with metrics.timer("stage_seconds", loop="scanner", stage="compute"):
+            watched['pairs'] = scan_market(btc_pairs, num_chunks)
+        if price_stream:
+            price_stream.watch(watched['pairs'])
+
+    scheduler = Scheduler()
+    scheduler.every(price_update_interval, update_prices)
+    scheduler.every(1800, rescan_market, run_now=False)  # Re-scan the market every 30 minutes (1800 seconds)
+    scheduler.run()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan Binance BTC pairs for moving average crossovers")
+    parser.add_argument("--max-requests", type=int, default=max_concurrent_requests, help="maximum concurrent Binance requests")
+    parser.add_argument("--chunks", type=int, default=5, help="1000-candle chunks of history to download per pair")
+    parser.add_argument("--price-interval", type=float, default=price_update_interval, help="seconds between price updates")
+    parser.add_argument("--stream-prices", action="store_true", help="follow prices over the Binance WebSocket streams")
+    parser.add_argument("--metrics-port", type=int, default=None, help="serve Prometheus-style metrics on this port")
+    parser.add_argument("--metrics-dump", default=None, help="dump the metrics as JSON to this file every minute")
+    args = parser.parse_args()
+
+    max_concurrent_requests = args.max_requests
+    client = binance_client(pool_size=max_concurrent_requests)
+    price_update_interval = args.price_interval
+    metrics.configure(args.metrics_port, args.metrics_dump)
+
     print("Fetching BTC trading pairs...")
     btc_pairs = get_btc_pairs()
     print(f"Found {len(btc_pairs)} BTC trading pairs.")
 
-    num_chunks = 5
+    num_chunks = args.chunks
 
     print("Scanning the market for potential price increase...")
     potential_price_increase = scan_market(btc_pairs, num_chunks)
@@ -158,6 +358,10 @@ if __name__ == "__main__":
 
     if potential_price_increase:
         print(f"Found {len(potential_price_increase)} trading pairs with potential price increase.")
-        monitor_potential_price_increase(potential_price_increase, num_chunks)
+        price_stream = None
+        if args.stream_prices:
+            from price_stream import PriceStream
+            price_stream = PriceStream()
+        monitor_potential_price_increase(potential_price_increase, num_chunks, price_stream)
     else:
         print("No trading pairs with potential price increase found.")
\ No newline at end of file
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The scripts import each other as top-level modules from their own directories,
+# and the common package from the repository root
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+for directory in ("benchmarks", "bitmex", "test", "Volume", ""):
+    sys.path.insert(0, os.path.abspath(os.path.join(root, directory)))
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import backtest
+import main
+from backtest import load_sentiment
+from realtime import DailyMovingAverages
+from stub_exchange import Fixtures, start_stub
+
+def write_scores(path, scores):
+    path.write_text("score\n" + "".join(f"{score}\n" for score in scores))
+    return str(path)
+
+def test_sentiment_is_cut_to_the_candles(tmp_path):
+    file_name = write_scores(tmp_path / "sentiment.csv", [0.1, -0.2, 0.3, 0.4])
+    np.testing.assert_array_equal(load_sentiment(file_name, 3), [0.1, -0.2, 0.3])
+
+def test_short_sentiment_file_is_rejected(tmp_path):
+    file_name = write_scores(tmp_path / "sentiment.csv", [0.1, -0.2])
+    with pytest.raises(ValueError, match="2 sentiment scores for 3 candles"):
+        load_sentiment(file_name, 3)
+
+@pytest.fixture
+def daily_closes(monkeypatch):
+    server, url = start_stub(Fixtures(1))
+    monkeypatch.setattr(main, "api_trade_bucketed_url", url + "/api/v1/trade/bucketed")
+    bins = main.client.get(main.api_trade_bucketed_url + '?binSize=1d&partial=false&symbol=XBTUSD&count=200&reverse=true').json()
+    yield np.array([trade_bin['close'] for trade_bin in reversed(bins)])
+    server.shutdown()
+
+def test_indicators_match_the_live_moving_averages(daily_closes):
+    long_period, short_period = main.long_ma_period, main.short_ma_period
+    # The values at bin t only use the bins before it; one more bin is appended so
+    # the last values cover every downloaded bin, like calculate_moving_averages
+    long_ma, short_ma, high, low = backtest.indicators(np.append(daily_closes, np.nan), long_period, short_period)
+
+    expected = main.calculate_moving_averages()
+    assert (long_ma[-1], short_ma[-1]) == (pytest.approx(expected['long_ma']), pytest.approx(expected['short_ma']))
+    assert (high[-1], low[-1]) == (daily_closes[-long_period:].max(), daily_closes[-long_period:].min())
+
+    # And at every bin, against the realtime runner's streaming windows
+    moving_averages = DailyMovingAverages(long_period, short_period)
+    for t, close in enumerate(daily_closes):
+        if moving_averages.ready():
+            assert (long_ma[t], short_ma[t]) == (pytest.approx(moving_averages.long_ma.value), pytest.approx(moving_averages.short_ma.value))
+        else:
+            assert np.isnan(short_ma[t])
+        moving_averages.append(close)
+
+def candles(rows):
+    opens, highs, lows, closes = np.array(rows, dtype=np.float64).T
+    return {"open": opens, "high": highs, "low": lows, "close": closes}
+
+def test_long_stop_trails_by_a_fixed_offset_without_look_ahead():
+    bins = candles([
+        (100, 100, 100, 100),    # Entry at 100, stop 10 below the high since entry
+        (101, 110, 101, 108),    # The stop moves to 110 - 10 = 100 for the next bin
+        (102, 130, 99.5, 125),   # The new high only counts from the next bin: stopped at 100
+        (125, 126, 124, 125),
+    ])
+    assert backtest.simulate(bins, np.array([1, 0, 0, 0]), 0.1) == [(0, 2, 1, 100, 100)]
+
+def test_long_stop_fills_at_the_open_on_a_gap():
+    bins = candles([(100, 100, 100, 100), (101, 110, 101, 108), (95, 96, 90, 92), (92, 93, 91, 92)])
+    assert backtest.simulate(bins, np.array([1, 0, 0, 0]), 0.1) == [(0, 2, 1, 100, 95)]
+
+def test_short_stop_mirrors_the_long_one():
+    bins = candles([(100, 100, 100, 100), (99, 99, 90, 92), (98, 100.5, 80, 85), (103, 110, 102, 108), (108, 108, 108, 108)])
+    # Stop 90 + 10 = 100 after bin 1, not moved by bin 2's low until bin 3, which gaps above it
+    assert backtest.simulate(bins, np.array([-1, 0, 0, 0, 0]), 0.1) == [(0, 2, -1, 100, 100)]
+    gapped = candles([(100, 100, 100, 100), (99, 99, 90, 92), (103, 110, 102, 108), (108, 108, 108, 108)])
+    assert backtest.simulate(gapped, np.array([-1, 0, 0, 0]), 0.1) == [(0, 2, -1, 100, 103)]
+
+def test_sweep_matches_backtest():
+    rng = np.random.default_rng(11)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, 400)))
+    opens = np.concatenate(([100], closes[:-1]))
+    bins = {"open": opens, "high": np.maximum(opens, closes) * 1.01, "low": np.minimum(opens, closes) * 0.99, "close": closes}
+    grid = [[10, 20], [5, 10], [-0.02, 0.0], [0.0, 0.02], [0.02, 0.05]]
+
+    results = dict(backtest.sweep(bins, grid, workers=2, chunk_size=5))
+    assert len(results) == 2 * 2 * 2 * 2 + 1 * 2 * 2 * 2   # short < long only
+    for parameters, stats in results.items():
+        assert stats == backtest.backtest(bins, *parameters)
+    assert any(stats['trades'] for stats in results.values())
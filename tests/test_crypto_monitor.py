@@ -0,0 +1,27 @@
+import pytest
+
+import crypto_monitor
+from kline_cache import KlineCache
+from stub_exchange import Fixtures, start_stub
+
+intervals = ["5m", "15m", "1h", "4h"]
+
+@pytest.fixture
+def fixtures(monkeypatch):
+    fixtures = Fixtures(30)
+    server, url = start_stub(fixtures)
+    monkeypatch.setattr(crypto_monitor.client, "base_url", url)
+    yield fixtures
+    server.shutdown()
+
+def test_cycle_reads_every_series_it_fetched(fixtures, monkeypatch):
+    # Fewer series fit in the cache than one cycle fetches
+    monkeypatch.setattr(crypto_monitor, "kline_cache", KlineCache(crypto_monitor.moving_average_window, max_series=50))
+    moving_averages = crypto_monitor.calculate_moving_averages(fixtures.symbols, intervals)
+
+    assert len(moving_averages) == 30 * len(intervals)
+    assert None not in moving_averages.values()
+    assert len(crypto_monitor.kline_cache.series) == 50
+
+def test_default_cache_holds_every_watched_series():
+    assert crypto_monitor.kline_cache.max_series == crypto_monitor.max_symbols_per_quote_asset * len(crypto_monitor.quote_assets) * len(crypto_monitor.kline_intervals)
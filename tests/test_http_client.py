@@ -0,0 +1,91 @@
+import socket
+import time
+
+import pytest
+import requests
+
+from common.http_client import ExchangeClient, RateLimiter, binance_client, bitmex_client
+from stub_exchange import Fixtures, start_stub
+
+@pytest.fixture
+def exchange():
+    server, url = start_stub(Fixtures(5))
+    yield server, url
+    server.shutdown()
+
+def test_bucket_refills_at_its_rate():
+    limiter = RateLimiter(10, period=1)
+    start = time.monotonic()
+    for _ in range(10):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.05
+    limiter.acquire(2)  # Two tokens at 10 per second
+    assert 0.15 <= time.monotonic() - start < 0.5
+
+def test_sync_only_lowers_the_tokens():
+    limiter = RateLimiter(100)
+    limiter.sync(40)
+    assert limiter.tokens == pytest.approx(40, abs=0.1)
+    limiter.sync(90)
+    assert limiter.tokens == pytest.approx(40, abs=0.1)
+
+def test_pause_blocks_acquire():
+    limiter = RateLimiter(100)
+    limiter.pause(0.3)
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.25
+
+def test_binance_used_weight_syncs_the_limiter(exchange):
+    server, url = exchange
+    # Another process on the same IP has used part of the budget already
+    binance_client(url).get("/api/v3/ticker/24hr", weight=80)
+    client = binance_client(url)
+    response = client.get("/api/v3/klines", params={"symbol": server.fixtures.symbols[0], "interval": "1h", "limit": 5}, weight=2)
+
+    assert response.headers["X-MBX-USED-WEIGHT-1M"] == "82"
+    assert client.limiter.tokens <= client.limiter.capacity - 82 + 0.5
+
+def test_bitmex_remaining_syncs_the_limiter(exchange):
+    server, url = exchange
+    client = bitmex_client(url + "/api/v1")
+    for _ in range(3):
+        response = client.get("/instrument?symbol=XBTUSD")
+    assert response.headers["x-ratelimit-remaining"] == "117"
+    assert client.limiter.tokens <= 117 + 0.5
+
+def test_rate_limited_get_waits_retry_after_and_retries(exchange):
+    server, url = exchange
+    server.throttled_requests, server.retry_after = 1, 1
+    client = ExchangeClient(url, RateLimiter(1000), backoff=0.01)
+
+    start = time.monotonic()
+    response = client.get("/api/v3/exchangeInfo", weight=20)
+    assert response.status_code == 200
+    assert time.monotonic() - start >= 0.9  # The Retry-After pause, not the backoff
+
+    summary = client.latency_summary()["GET /api/v3/exchangeInfo"]
+    assert (summary['count'], summary['errors']) == (2, 1)
+    assert summary['max_ms'] >= summary['avg_ms'] > 0
+
+def test_post_is_not_retried(exchange):
+    server, url = exchange
+    server.throttled_requests, server.retry_after = 2, 1
+    client = ExchangeClient(url + "/api/v1", RateLimiter(1000), backoff=0.01)
+
+    response = client.post("/order", data="{}")
+    assert response.status_code == 429
+    assert server.throttled_requests == 1
+    assert client.limiter.blocked_until > time.monotonic()
+    assert client.latency_summary()["POST /api/v1/order"]['count'] == 1
+
+def test_connection_errors_are_retried_then_raised():
+    with socket.socket() as closed:
+        closed.bind(("127.0.0.1", 0))
+        port = closed.getsockname()[1]
+    client = ExchangeClient(f"http://127.0.0.1:{port}", RateLimiter(1000), max_retries=2, backoff=0.01)
+
+    with pytest.raises(requests.ConnectionError):
+        client.get("/api/v3/klines")
+    summary = client.latency_summary()["GET /api/v3/klines"]
+    assert (summary['count'], summary['errors']) == (3, 3)
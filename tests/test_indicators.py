@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from common.indicators import EMA, SMA, Crossover, RollingMax, RollingMin
+
+values = np.random.default_rng(7).normal(0, 1, 500).cumsum() + 100
+
+def streamed(indicator, window):
+    # Values after each update, NaN until the indicator is ready
+    state = indicator(window)
+    series = []
+    for value in values:
+        result = state.update(value)
+        series.append(result if state.ready else np.nan)
+    return np.array(series)
+
+@pytest.mark.parametrize("indicator", [SMA, EMA, RollingMax, RollingMin])
+@pytest.mark.parametrize("window", [1, 2, 20, 499, 600])
+def test_update_matches_batch(indicator, window):
+    np.testing.assert_allclose(streamed(indicator, window), indicator.batch(values, window), rtol=1e-12)
+
+def test_ema_batch_matches_pandas():
+    pandas = pytest.importorskip("pandas")
+    long_values = np.random.default_rng(3).normal(0, 1, 20_000).cumsum() + 1000
+    expected = pandas.Series(long_values).ewm(span=3, adjust=False).mean().to_numpy().copy()
+    expected[:2] = np.nan
+    np.testing.assert_allclose(EMA.batch(long_values, 3), expected, rtol=1e-12)
+
+@pytest.mark.parametrize("indicator", [SMA, EMA])
+def test_replace_last_matches_updating_with_the_final_value(indicator):
+    revised, final = indicator(10), indicator(10)
+    for value in values[:30]:
+        revised.update(value)
+        final.update(value)
+    revised.update(1.0)
+    revised.replace_last(2.0)
+    revised.replace_last(values[30])
+    final.update(values[30])
+    assert revised.value == pytest.approx(final.value)
+    assert revised.update(values[31]) == pytest.approx(final.update(values[31]))
+
+def test_replace_last_on_empty_indicators_updates():
+    assert SMA(3).replace_last(5.0) == 5.0
+    assert EMA(3).replace_last(5.0) == 5.0
+
+def test_crossover_needs_the_difference_to_leave_zero():
+    crossover = Crossover()
+    assert crossover.update(1, 2) == (False, False)    # Below, nothing before
+    assert crossover.update(2, 2) == (False, False)    # Touching is not crossing
+    assert crossover.update(3, 2) == (True, False)     # From 0 to above
+    assert crossover.update(2, 2) == (False, False)
+    assert crossover.update(1, 2) == (False, True)     # From 0 to below
+    assert crossover.update(None, 2) == (False, False)
+    assert crossover.update(3, 2) == (False, False)    # No crossing after a missing value
+
+def test_crossover_replace_last_revises_the_open_candle():
+    crossover = Crossover()
+    crossover.update(1, 2)
+    assert crossover.update(3, 2) == (True, False)
+    assert crossover.replace_last(1.5, 2) == (False, False)  # The candle closed back below
+    assert crossover.replace_last(2, 2) == (False, False)
+    assert crossover.update(3, 2) == (True, False)
+
+def test_crossover_batch_matches_update():
+    fast, slow = SMA.batch(values, 5), SMA.batch(values, 20)
+    crossover = Crossover()
+    streamed_crossings = [crossover.update(None if np.isnan(f) else f, None if np.isnan(s) else s) for f, s in zip(fast, slow)]
+    above, below = Crossover.batch(fast, slow)
+    assert [tuple(pair) for pair in zip(above.tolist(), below.tolist())] == streamed_crossings
+    assert above.any() and below.any()
@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+import pytest
+
+from common import json_decoder
+from stub_exchange import Fixtures
+from ticker_columns import SymbolIndex, TickerSnapshot, ticker_schema
+
+@pytest.fixture(params=json_decoder.backends)
+def backend(request):
+    previous = json_decoder.backend
+    json_decoder.use_backend(request.param)
+    yield request.param
+    json_decoder.use_backend(previous)
+
+def test_columns_match_records(backend):
+    data = json.dumps(Fixtures(50).current).encode()
+    records = ticker_schema.decode(data)
+    columns = ticker_schema.decode_columns(data)
+
+    assert columns["symbol"] == [record.symbol for record in records]
+    for attribute in ("quote_volume", "last_price", "price_change_pct"):
+        assert columns[attribute].dtype == np.float64
+        np.testing.assert_array_equal(columns[attribute], [getattr(record, attribute) for record in records])
+
+def test_snapshot_from_columns(backend):
+    fixtures = Fixtures(8)
+    index = SymbolIndex("BTC")
+    snapshot = TickerSnapshot(index, ticker_schema.decode_columns(json.dumps(fixtures.current[2:]).encode()))
+    assert index.symbols == fixtures.symbols[2:]
+    np.testing.assert_array_equal(snapshot.last_price, [float(ticker['lastPrice']) for ticker in fixtures.current[2:]])
+
+    # Symbols first seen later get new rows; the earlier snapshot is padded to match
+    empty = TickerSnapshot(index, ticker_schema.columns([]))
+    assert not empty.present.any()
+    current = TickerSnapshot(index, ticker_schema.decode_columns(json.dumps(fixtures.current).encode()))
+    assert len(current) == 8 and current.present.all()
+    present, quote_volume = snapshot.aligned(8)
+    assert present.tolist() == [True] * 6 + [False] * 2
+    assert np.isnan(quote_volume[6:]).all()
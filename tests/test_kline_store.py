@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+
+from kline_store import KlineStore, klines_to_records
+from stub_exchange import Fixtures
+
+def records(start, count):
+    fixtures = Fixtures(1)
+    return klines_to_records(fixtures.all_klines(fixtures.symbols[0])[start:start + count])
+
+def test_append_replaces_the_open_candle(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("ABCBTC", records(0, 10))
+    # The last stored candle comes again (now closed) with two newer ones
+    assert store.append("ABCBTC", records(9, 3)) == 3
+    np.testing.assert_array_equal(store.load("ABCBTC"), records(0, 12))
+    assert store.last_open_time("ABCBTC") == int(records(11, 1)["open_time"][0])
+
+def test_append_of_fewer_candles_shrinks_the_file(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("ABCBTC", records(0, 10))
+    store.append("ABCBTC", records(5, 2))
+    np.testing.assert_array_equal(store.load("ABCBTC"), records(0, 7))
+
+def test_replace_keeps_open_maps_and_old_file_until_swapped(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("ABCBTC", records(0, 10))
+    live = store.load("ABCBTC")
+
+    store.append("ABCBTC", records(100, 4), replace=True)
+    # The map still reads the history it was opened on; the file holds the new one
+    np.testing.assert_array_equal(live, records(0, 10))
+    np.testing.assert_array_equal(store.load("ABCBTC"), records(100, 4))
+    assert os.listdir(tmp_path) == ["ABCBTC.klines"]
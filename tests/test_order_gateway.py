@@ -0,0 +1,85 @@
+import hashlib
+import hmac
+
+import pytest
+import requests
+
+from common.http_client import bitmex_client
+from order_gateway import OrderGateway
+from stub_exchange import Fixtures, start_stub
+
+@pytest.fixture
+def exchange():
+    server, url = start_stub(Fixtures(10), api_secret="stub_secret")
+    yield server, url + "/api/v1"
+    server.shutdown()
+
+def gateway(url, api_secret="stub_secret", use_bulk_orders=False):
+    return OrderGateway(bitmex_client(url), "stub_key", api_secret, use_bulk_orders)
+
+def test_sign_matches_bitmex_signature():
+    headers = gateway("http://127.0.0.1/api/v1").sign('POST', '/api/v1/order', '{"symbol": "XBTUSD"}')
+    message = 'POST/api/v1/order' + headers['api-expires'] + '{"symbol": "XBTUSD"}'
+    assert headers['api-signature'] == hmac.new(b"stub_secret", message.encode(), hashlib.sha256).hexdigest()
+    assert headers['api-key'] == "stub_key"
+
+def test_wrong_secret_is_rejected(exchange):
+    server, url = exchange
+    status = gateway(url, api_secret="wrong").place_order({'symbol': 'XBTUSD', 'orderQty': 1, 'price': 100, 'ordType': 'Limit', 'side': 'Buy'})
+    assert status['error']['message'] == "Signature not valid."
+    assert not server.orders
+
+@pytest.mark.parametrize("use_bulk_orders", [False, True])
+def test_entry_with_trailing_stop(exchange, use_bulk_orders):
+    server, url = exchange
+    order_status, stop_order_status = gateway(url, use_bulk_orders=use_bulk_orders).place_with_trailing_stop('XBTUSD', 'Buy', 10, 100.0, 0.05)
+
+    assert server.orders[order_status['orderID']]['ordType'] == 'Limit'
+    stop = server.orders[stop_order_status['orderID']]
+    assert (stop['ordType'], stop['side'], stop['pegOffsetValue']) == ('Stop', 'Sell', -5.0)
+    assert 'ReduceOnly' in stop['execInst'].split(',')
+    assert all(order['ordStatus'] == 'New' for order in server.orders.values())
+
+@pytest.mark.parametrize("use_bulk_orders", [False, True])
+def test_rejected_entry_cancels_stop(exchange, use_bulk_orders):
+    server, url = exchange
+    order_status, stop_order_status = gateway(url, use_bulk_orders=use_bulk_orders).place_with_trailing_stop('XBTUSD', 'Buy', 10, -1.0, 0.05)
+
+    assert order_status['error']['name'] == "ValidationError"
+    assert stop_order_status is None
+    [stop] = server.orders.values()
+    assert (stop['ordType'], stop['ordStatus']) == ('Stop', 'Canceled')
+
+def test_failed_entry_request_cancels_stop(exchange):
+    server, url = exchange
+    server.order_failures['Limit'] = 502  # An HTML error page, not JSON
+    with pytest.raises(requests.JSONDecodeError):
+        gateway(url).place_with_trailing_stop('XBTUSD', 'Sell', 10, 100.0, 0.05)
+
+    [stop] = server.orders.values()
+    assert (stop['ordType'], stop['side'], stop['ordStatus']) == ('Stop', 'Buy', 'Canceled')
+
+@pytest.mark.parametrize("use_bulk_orders", [False, True])
+def test_rejected_stop_cancels_entry(exchange, use_bulk_orders, capsys):
+    server, url = exchange
+    server.order_rejections['Stop'] = "Invalid pegOffsetValue"
+    order_status, stop_order_status = gateway(url, use_bulk_orders=use_bulk_orders).place_with_trailing_stop('XBTUSD', 'Buy', 10, 100.0, 0.05)
+
+    assert stop_order_status['error']['message'] == "Invalid pegOffsetValue"
+    [entry] = server.orders.values()
+    assert order_status == entry and entry['ordStatus'] == 'Canceled'
+    assert "Trailing stop rejected" in capsys.readouterr().out
+
+def test_failed_stop_request_cancels_entry(exchange):
+    server, url = exchange
+    server.order_failures['Stop'] = 504
+    with pytest.raises(requests.JSONDecodeError):
+        gateway(url).place_with_trailing_stop('XBTUSD', 'Buy', 10, 100.0, 0.05)
+
+    [entry] = server.orders.values()
+    assert (entry['ordType'], entry['ordStatus']) == ('Limit', 'Canceled')
+
+def test_missing_statuses_are_not_orders(exchange):
+    server, url = exchange
+    # e.g. an empty list from /order/bulk
+    assert gateway(url).pair_up(None, None) == (None, None)
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+
+import main
+import realtime
+from realtime import InstrumentState, RealtimeEngine
+from stub_exchange import Fixtures, start_stub
+
+@pytest.fixture
+def daily_bins(monkeypatch):
+    # The daily bins calculate_moving_averages downloads from the stub, oldest first
+    server, url = start_stub(Fixtures(1))
+    monkeypatch.setattr(main, "api_trade_bucketed_url", url + "/api/v1/trade/bucketed")
+    count = main.long_ma_period + main.short_ma_period - 1 + 50
+    bins = main.client.get(main.api_trade_bucketed_url + '?binSize=1d&partial=false&symbol=XBTUSD&count=' + str(count) + '&reverse=true').json()
+    yield list(reversed(bins))
+    server.shutdown()
+
+@pytest.fixture
+def orders(monkeypatch):
+    placed = []
+    monkeypatch.setattr(realtime, "place_limit_order_with_trailing_stop", lambda *args: placed.append(args))
+    return placed
+
+def replay(engine, frames):
+    # Serve the frames on a local realtime feed and feed them to the engine until
+    # every frame is handled and every order it dispatched has been placed
+    requested_paths = []
+    handled = asyncio.Event()
+    handle_message = engine.handle_message
+
+    def count_message(message):
+        handle_message(message)
+        count_message.handled += 1
+        if count_message.handled == len(frames):
+            handled.set()
+    count_message.handled = 0
+    engine.handle_message = count_message
+
+    async def handler(connection):
+        requested_paths.append(connection.request.path)
+        for frame in frames:
+            await connection.send(json.dumps(frame))
+        await connection.wait_closed()
+
+    async def run():
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            engine.url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}/realtime"
+            consumer = asyncio.create_task(engine.consume(list(engine.instruments)))
+            await asyncio.wait_for(handled.wait(), 5)
+            while engine.tasks:
+                await asyncio.wait_for(asyncio.gather(*engine.tasks), 5)
+            consumer.cancel()
+
+    asyncio.run(run())
+    return requested_paths
+
+def trade_bin_frames(symbol, bins):
+    return [{'table': 'tradeBin1d', 'action': 'insert', 'data': [dict(trade_bin, symbol=symbol)]} for trade_bin in bins]
+
+def test_streamed_daily_bins_match_rest_moving_averages(daily_bins, orders):
+    instrument = InstrumentState('XBTUSD', keyword='replay')
+    # A repeated bin is ignored
+    frames = trade_bin_frames('XBTUSD', daily_bins) + trade_bin_frames('XBTUSD', daily_bins[-1:])
+    assert replay(RealtimeEngine([instrument]), frames) == ["/realtime?subscribe=instrument:XBTUSD,trade:XBTUSD,tradeBin1d:XBTUSD"]
+
+    expected = main.calculate_moving_averages()
+    assert instrument.moving_averages.ready()
+    assert instrument.moving_averages.values() == pytest.approx(expected)
+
+    closes = [trade_bin['close'] for trade_bin in daily_bins[-main.long_ma_period:]]
+    assert (instrument.breakout_high, instrument.breakout_low) == (max(closes), min(closes))
+    assert orders == []
+
+def test_breakout_trade_places_one_order(daily_bins, orders):
+    # Thresholds that let any crossover through, so the breakout and sentiment decide
+    buyer = InstrumentState('XBTUSD', quantity=5, keyword='replay', buy_threshold=-1, sell_threshold=1, stop_loss_percentage=0.03)
+    other = InstrumentState('ETHUSD', keyword='replay')
+    buyer.sentiment.latest = 0.5
+
+    high = max(trade_bin['close'] for trade_bin in daily_bins[-main.long_ma_period:])
+    frames = trade_bin_frames('XBTUSD', daily_bins) + [
+        {'table': 'instrument', 'action': 'partial', 'data': [{'symbol': 'XBTUSD', 'bidPrice': high + 1, 'askPrice': high + 2}]},
+        {'table': 'trade', 'action': 'insert', 'data': [{'symbol': 'XBTUSD', 'price': high - 1}]},  # No breakout
+        {'table': 'trade', 'action': 'insert', 'data': [{'symbol': 'ETHUSD', 'price': high + 5}]},  # Not seeded yet
+        {'table': 'trade', 'action': 'insert', 'data': [{'symbol': 'XBTUSD', 'price': high}, {'symbol': 'XBTUSD', 'price': high + 3}]},
+        {'table': 'trade', 'action': 'insert', 'data': [{'symbol': 'XBTUSD', 'price': high + 4}]},  # Within the order cooldown
+    ]
+    replay(RealtimeEngine([buyer, other]), frames)
+
+    assert orders == [('Buy', high + 1, 0.03, 'XBTUSD', 5)]
+    assert not buyer.order_in_flight
@@ -0,0 +1,28 @@
+import pytest
+
+import test as scanner  # test/test.py, ahead of the standard library's test package on sys.path
+from stub_exchange import Fixtures, start_stub
+
+@pytest.fixture
+def fixtures(monkeypatch):
+    fixtures = Fixtures(150)
+    server, url = start_stub(fixtures)
+    monkeypatch.setattr(scanner.client, "base_url", url)
+    yield fixtures
+    server.shutdown()
+
+def satoshis(fixtures, symbols):
+    return {symbol: int(float(fixtures.tickers_by_symbol[symbol]['lastPrice']) * 1e8) for symbol in symbols}
+
+def test_prices_of_a_few_symbols(fixtures):
+    symbols = fixtures.symbols[:3]
+    assert scanner.get_current_prices(symbols) == satoshis(fixtures, symbols)
+
+def test_prices_of_many_symbols_are_filtered_locally(fixtures):
+    symbols = fixtures.symbols[:scanner.max_symbols_per_price_request + 20]
+    assert scanner.get_current_prices(symbols) == satoshis(fixtures, symbols)
+
+def test_delisted_symbol_falls_back_to_all_prices(fixtures, capsys):
+    symbols = fixtures.symbols[:3] + ["DELISTEDBTC"]
+    assert scanner.get_current_prices(symbols) == satoshis(fixtures, fixtures.symbols[:3])
+    assert "Invalid symbol." in capsys.readouterr().out
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+import common.scheduler
+from common.metrics import Counter, Registry
+from common.scheduler import Scheduler
+
+class RecordingJob:
+    # A job function that counts its runs and, while `hold` is cleared, blocks
+    def __init__(self):
+        self.runs = 0
+        self.hold = threading.Event()
+        self.hold.set()
+
+    def __call__(self):
+        self.runs += 1
+        self.hold.wait(5)
+
+@pytest.fixture
+def metrics(monkeypatch):
+    registry = Registry()
+    registry.enabled = True
+    monkeypatch.setattr(common.scheduler, "metrics", registry)
+    return registry
+
+@pytest.fixture
+def scheduler():
+    scheduler = Scheduler()
+    yield scheduler
+    scheduler.stop()
+
+def schedule(scheduler, func, interval=10, first_run=100.0):
+    # A job whose first deadline is at `first_run` on the synthetic clock
+    job = scheduler.every(interval, func, name="job")
+    job.next_run = first_run
+    return job
+
+def finished(job):
+    deadline = time.monotonic() + 5
+    while job.running and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return not job.running
+
+def skipped_ticks(metrics):
+    return metrics.get(Counter, "scheduler_skipped_ticks_total", {'job': "job"}).value
+
+def test_deadlines_stay_on_the_grid(scheduler, metrics):
+    func = RecordingJob()
+    job = schedule(scheduler, func)
+
+    assert scheduler.submit_due(99.0) == 100.0
+    assert func.runs == 0
+    assert scheduler.submit_due(100.0) == 110.0
+    assert finished(job) and func.runs == 1
+
+    # Starting late or running for part of an interval never moves the grid
+    assert scheduler.submit_due(104.0) == 110.0
+    assert scheduler.submit_due(113.5) == 120.0
+    assert finished(job) and func.runs == 2
+    assert scheduler.submit_due(120.0) == 130.0
+    assert finished(job) and func.runs == 3
+    assert skipped_ticks(metrics) == 0
+
+def test_overrunning_job_is_never_started_twice(scheduler, metrics):
+    func = RecordingJob()
+    func.hold.clear()
+    job = schedule(scheduler, func)
+
+    scheduler.submit_due(100.0)
+    assert scheduler.submit_due(110.0) == 120.0   # Still running: the tick is skipped
+    assert scheduler.submit_due(125.0) == 130.0
+    assert func.runs == 1 and job.running
+    assert skipped_ticks(metrics) == 2
+
+    func.hold.set()
+    assert finished(job)
+    scheduler.submit_due(130.0)
+    assert finished(job) and func.runs == 2
+
+def test_missed_ticks_are_coalesced_and_counted(scheduler, metrics):
+    func = RecordingJob()
+    job = schedule(scheduler, func)
+    scheduler.submit_due(100.0)
+    assert finished(job)
+
+    # Deadlines 110 to 140 all passed (e.g. the process was suspended): one run,
+    # the three later ticks counted as skipped, and the next deadline back on the grid
+    assert scheduler.submit_due(145.0) == 150.0
+    assert finished(job) and func.runs == 2
+    assert skipped_ticks(metrics) == 3
+
+def test_next_deadline_is_the_earliest_job(scheduler, metrics):
+    fast, slow = RecordingJob(), RecordingJob()
+    schedule(scheduler, fast, interval=5, first_run=100.0)
+    schedule(scheduler, slow, interval=60, first_run=102.0)
+    assert scheduler.submit_due(100.0) == 102.0
+    assert scheduler.submit_due(102.0) == 105.0
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+import sentiment
+from sentiment import ArticleScores, SentimentService
+from stub_exchange import Fixtures, start_stub
+
+class CountingAnalyzer:
+    # Stands in for VADER: the compound score is read from the headline itself
+    def __init__(self):
+        self.scored = []
+
+    def polarity_scores(self, title):
+        self.scored.append(title)
+        return {'compound': float(title.split()[-1])}
+
+@pytest.fixture
+def news(monkeypatch):
+    server, url = start_stub(Fixtures(1))
+    server.articles = [{'url': f"https://news.example/{i}", 'title': f"Bitcoin headline {score}"} for i, score in enumerate((0.5, -0.1, 0.2))]
+    analyzer = CountingAnalyzer()
+    monkeypatch.setattr(sentiment, "analyzer", analyzer)
+    yield server, url + "/v2/everything", analyzer
+    server.shutdown()
+
+def test_refresh_scores_each_headline_once(news):
+    server, url, analyzer = news
+    service = SentimentService('bitcoin', 'news_key', url)
+
+    assert service.refresh() == pytest.approx(0.2)
+    assert analyzer.scored == ["Bitcoin headline 0.5", "Bitcoin headline -0.1", "Bitcoin headline 0.2"]
+    assert server.news_requests == [{'q': 'bitcoin', 'apiKey': 'news_key'}]
+
+    # Nothing new: no headline is scored again
+    assert service.refresh() == pytest.approx(0.2)
+    assert len(analyzer.scored) == 3
+
+    # Only the new headline is scored
+    server.articles = server.articles[1:] + [{'url': "https://news.example/3", 'title': "Bitcoin headline -0.4"}]
+    assert service.refresh() == pytest.approx(-0.1)
+    assert analyzer.scored[3:] == ["Bitcoin headline -0.4"]
+
+def test_shared_scores_across_keywords(news):
+    server, url, analyzer = news
+    scores = ArticleScores()
+    SentimentService('bitcoin', 'news_key', url, scores=scores).refresh()
+    SentimentService('btc', 'news_key', url, scores=scores).refresh()
+    assert len(analyzer.scored) == 3
+
+def test_expired_scores_are_evicted_and_scored_again(news):
+    server, url, analyzer = news
+    service = SentimentService('bitcoin', 'news_key', url, cache_ttl=1)
+    service.refresh()
+    assert len(service.scores.scores) == 3
+
+    server.articles = server.articles[:1]
+    time.sleep(1.1)
+    assert service.refresh() == pytest.approx(0.5)
+    assert analyzer.scored[3:] == ["Bitcoin headline 0.5"]
+    assert len(service.scores.scores) == 1
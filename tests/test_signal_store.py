@@ -0,0 +1,18 @@
+from records import Signal
+from signal_store import SignalStore
+
+def signal(symbol, volume_change_pct, current_price):
+    return Signal(symbol, "BTC", "1h", volume_change_pct, 1.0, current_price * 0.9, current_price)
+
+def test_signals_resolve_only_near_their_horizon(tmp_path):
+    store = SignalStore(str(tmp_path / "signals.db")).start()
+    now = 100_000
+    store.add([signal("AAABTC", 12, 1.0)], timestamp=now - 3610)   # Due now
+    store.add([signal("BBBBTC", 25, 1.0)], timestamp=now - 90_000)  # From before the downtime
+    store.add([signal("CCCBTC", 31, 1.0)], timestamp=now - 60)      # Not due yet
+    store.resolve({"AAABTC": 1.2, "BBBBTC": 0.5, "CCCBTC": 0.5}, 3600, 60, now=now)
+    store.flush()
+
+    outcomes = {row['symbol']: row['outcome_price'] for batch in store.recent_batches() for row in batch}
+    assert outcomes == {"AAABTC": 1.2, "BBBBTC": None, "CCCBTC": None}
+    assert store.hit_rate_by_volume_change() == [{'bucket': 10, 'signals': 1, 'hit_rate': 1}]
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+
+import crypto_monitor
+import stream_monitor
+from kline_cache import KlineCache
+from stream_monitor import StreamMonitor, volume_lookback
+from stub_exchange import Fixtures, start_stub
+
+@pytest.fixture
+def fixtures(monkeypatch):
+    # REST klines come from the stub exchange, into an empty kline cache
+    fixtures = Fixtures(10)
+    server, url = start_stub(fixtures)
+    monkeypatch.setattr(crypto_monitor.client, "base_url", url)
+    monkeypatch.setattr(stream_monitor, "kline_cache", KlineCache(crypto_monitor.moving_average_window))
+    yield fixtures
+    server.shutdown()
+
+def ticker(symbol, event_time, quote_volume, last_price):
+    return {'e': '24hrTicker', 'E': event_time, 's': symbol, 'q': f"{quote_volume:.8f}", 'c': f"{last_price:.8f}", 'P': "1.500"}
+
+def replay(monitor, streams, frames):
+    # Serve the recorded frames on a local combined stream and feed them to the monitor
+    # until every frame is handled and every evaluation triggered by them has finished
+    requested_paths = []
+    handled = asyncio.Event()
+    handle_message = monitor.handle_message
+
+    def count_message(message):
+        handle_message(message)
+        count_message.handled += 1
+        if count_message.handled == len(frames):
+            handled.set()
+    count_message.handled = 0
+    monitor.handle_message = count_message
+
+    async def handler(connection):
+        requested_paths.append(connection.request.path)
+        for frame in frames:
+            await connection.send(json.dumps(frame))
+        await connection.wait_closed()
+
+    async def run():
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            monitor.url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}/stream?streams="
+            consumer = asyncio.create_task(monitor.consume(streams))
+            await asyncio.wait_for(handled.wait(), 5)
+            while monitor.tasks:
+                await asyncio.wait_for(asyncio.gather(*monitor.tasks), 5)
+            consumer.cancel()
+
+    asyncio.run(run())
+    return requested_paths
+
+def test_volume_increase_above_moving_average_signals(fixtures):
+    rising, falling, seeded, ignored = fixtures.symbols[:4]
+    closes = {symbol: float(fixtures.klines(symbol)[-1][4]) for symbol in fixtures.symbols}
+    start = fixtures.now_ms
+    later = start + volume_lookback * 1000
+
+    # A series already in the cache is kept current by its kline stream
+    stream_monitor.kline_cache.update(seeded, "1h", fixtures.klines(seeded, limit=crypto_monitor.moving_average_window))
+    last_candle = fixtures.klines(seeded)[-1]
+    kline = {'e': 'kline', 'E': later, 's': seeded, 'k': {'t': last_candle[0], 'T': last_candle[6], 'i': "1h", 'c': f"{closes[seeded] * 2:.8f}"}}
+
+    frames = [
+        {'stream': "!ticker@arr", 'data': [ticker(rising, start, 100, closes[rising]), ticker(falling, start, 100, closes[falling]),
+                                           ticker(ignored, start, 100, closes[ignored])]},
+        {'stream': f"{seeded.lower()}@kline_1h", 'data': kline},
+        # 50% more volume; only `rising` trades above its moving average
+        {'stream': "!ticker@arr", 'data': [ticker(rising, later, 150, closes[rising] * 10), ticker(falling, later, 150, closes[falling] / 10),
+                                           ticker(ignored, later, 150, closes[ignored] * 10)]},
+    ]
+    monitor = StreamMonitor([rising, falling, seeded], ["1h"], 10, port=None)
+    streams = ["!ticker@arr", f"{seeded.lower()}@kline_1h"]
+    assert replay(monitor, streams, frames) == ["/stream?streams=!ticker@arr/" + streams[1]]
+
+    # The moving average of the downloaded window with the open candle at the streamed price
+    window = [float(k[4]) for k in fixtures.klines(rising, limit=crypto_monitor.moving_average_window)]
+    expected_average = (sum(window[:-1]) + closes[rising] * 10) / len(window)
+
+    [signal] = monitor.new_signals
+    assert (signal.symbol, signal.interval, signal.current_price) == (rising, "1h", pytest.approx(closes[rising] * 10))
+    assert signal.volume_change_pct == pytest.approx(50)
+    assert signal.moving_average == pytest.approx(expected_average)
+
+    seeded_window = [float(k[4]) for k in fixtures.klines(seeded, limit=crypto_monitor.moving_average_window)]
+    expected_seeded = (sum(seeded_window[:-1]) + closes[seeded] * 2) / len(seeded_window)
+    assert stream_monitor.kline_cache.moving_average(seeded, "1h") == pytest.approx(expected_seeded)
+    assert (falling, "1h") in stream_monitor.kline_cache.series
+    assert ignored not in monitor.table.tickers
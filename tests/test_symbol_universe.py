@@ -0,0 +1,30 @@
+import pytest
+
+from common.http_client import binance_client
+from stub_exchange import Fixtures, start_stub
+from symbol_universe import SymbolUniverse
+
+@pytest.fixture
+def exchange():
+    fixtures = Fixtures(8)
+    server, url = start_stub(fixtures)
+    yield fixtures, binance_client(url)
+    server.shutdown()
+
+def test_first_download_reports_no_changes(exchange, tmp_path):
+    fixtures, client = exchange
+    universe = SymbolUniverse(str(tmp_path / "exchange_info.json"))
+    assert universe.refresh(client) == ([], [])
+    assert universe.trading() == set(fixtures.symbols)
+
+def test_later_downloads_report_changes(exchange, tmp_path):
+    fixtures, client = exchange
+    path = str(tmp_path / "exchange_info.json")
+    SymbolUniverse(path).refresh(client)
+
+    # Loaded from the cache: unchanged (a 304), then one symbol delisted and one listed
+    universe = SymbolUniverse(path)
+    assert universe.refresh(client, force=True) == ([], [])
+    removed = fixtures.symbols.pop(0)
+    fixtures.symbols.append("NEWBTC")
+    assert universe.refresh(client, force=True) == (["NEWBTC"], [removed])